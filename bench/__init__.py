@@ -0,0 +1,3 @@
+"""Benchmarks. Run them from the repository root: `python -m bench` for the main suite, or e.g.
+`python -m bench.no_guess` for a single one.
+"""
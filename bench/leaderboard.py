@@ -0,0 +1,79 @@
+"""Benchmark the leaderboard store with a lot of recorded games: rebuilding the index from the log, the queries the
+leaderboard screen makes, and how long `submit` holds up the game.
+Everything goes in a temporary directory.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from dataclasses import asdict
+from typing import Callable
+
+from leaderboard import PAGE_SIZE, GameResult, Leaderboard
+
+
+CATEGORIES = ['easy', 'medium', 'hard', 'easy (no-guess)', 'medium (no-guess)', 'hard (no-guess)']
+
+
+def fake_result(date: float) -> GameResult:
+    return GameResult(random.choice(CATEGORIES), random.random() < 0.4, random.randrange(300, 60000), date,
+                      random.getrandbits(32), 100, 0, random.randrange(20, 200), random.randrange(20, 400))
+
+
+def median_time(function: Callable[[], object], repeat: int = 200) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--games', type=int, default=500000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        log_path = os.path.join(directory, 'results.log')
+        with open(log_path, 'w', encoding='utf-8') as log:
+            for number in range(args.games):
+                log.write(json.dumps(asdict(fake_result(1.7e9 + number))) + '\n')
+        start = time.perf_counter()
+        store = Leaderboard(log_path, os.path.join(directory, 'index.sqlite3'), os.path.join(directory, 'replays.hxr'))
+        store.start()
+        store.close()  # after it caught up
+        print(f'indexed {args.games} games in {time.perf_counter() - start:.2f}s')
+
+        category = 'hard'
+        wins = store.wins(category)
+        deep = wins // 2  # the key of the entry in the middle, to start a page from there
+        key = store._read('SELECT ticks, date, id FROM wins WHERE category = ? ORDER BY ticks, date, id '
+                          'LIMIT 1 OFFSET ?', (category, deep))[0]
+        timings = {
+            'top page': lambda: store.page(category, count=PAGE_SIZE + 1),
+            f'page at rank {deep}': lambda: store.page(category, key, PAGE_SIZE + 1),
+            'top page by 3BV/s': lambda: store.page(category, count=PAGE_SIZE + 1, order='3BV/s'),
+            'personal best': lambda: store.best(category),
+            'best 3BV/s': lambda: store.best(category, '3BV/s'),
+            'wins': lambda: store.wins(category),
+            'categories': store.categories,
+        }
+        print(f'{wins} wins on {category!r}')
+        for name, function in timings.items():
+            print(f'{name:>22}: {median_time(function)*1e6:8.1f} us')
+
+        store = Leaderboard(store.log_path, store.index_path, store.replay_path)
+        store.start()
+        submit = median_time(lambda: store.submit(fake_result(time.time())), 1000)
+        print(f'{"submit":>22}: {submit*1e6:8.1f} us (the writing happens on the other thread)')
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
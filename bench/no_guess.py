@@ -0,0 +1,43 @@
+"""Benchmark no-guess board generation: solvable boards per second and how many layouts get rejected."""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+import generation
+from engine import DIFFICULTIES, Minefield
+
+
+def bench_difficulty(name: str, boards: int) -> None:
+    width, height, mine_count = DIFFICULTIES[name]
+    minefield = Minefield(width, height, mine_count)
+    minefield.init()
+    tried = 0
+    found = 0
+    start = time.perf_counter()
+    for _ in range(boards):
+        first = minefield.board.coordinate(random.choice(minefield.board.indices))
+        seed, attempts = generation.no_guess_layout(width, height, mine_count, first, timeout=None)
+        tried += attempts
+        found += seed is not None
+    elapsed = time.perf_counter() - start
+    print(f'{name:>8}: {found/elapsed:8.2f} boards/s  {elapsed/boards*1000:8.1f} ms/board  '
+          f'{tried/elapsed:8.1f} layouts/s  rejected {100 - 100*found/tried:5.1f}%')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--boards', type=int, default=20, help='boards to generate per difficulty')
+    parser.add_argument('difficulties', nargs='*', default=list(DIFFICULTIES))
+    args = parser.parse_args()
+    # start the workers up front so that isn't counted in the first board
+    generation.get_executor().submit(int).result()
+    print(f'{generation.get_executor()._max_workers} worker processes')
+    for name in args.difficulties:
+        bench_difficulty(name, args.boards)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark picking the mines against the original implementation, on boards up to a million tiles.
+`set_mines` is the whole seeded placement, including filling in the tiles and counts and measuring the board (`metrics`
+is only that last part).
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+
+from board import NEARBY_TILES
+from engine import Minefield
+from metrics import measure
+
+
+# width, height (about 10^3 to 10^6 tiles)
+SIZES = [(33, 31), (101, 100), (317, 316), (1001, 1000)]
+DENSITY = 0.2
+
+
+def legacy_layout(minefield: Minefield, remove_this: tuple[int, int]) -> list[tuple[int, int]]:
+    """The original `set_mines`: copy every coordinate, `list.remove` the first click and its neighbors, and shuffle
+    the whole thing to take the top few.
+    """
+    tiles = list(minefield.board.keys())
+    tiles.remove(remove_this)
+    for i_off, j_off in NEARBY_TILES:
+        i1 = remove_this[0] + i_off
+        j1 = remove_this[1] + j_off
+        if (i1, j1) in minefield.board:
+            tiles.remove((i1, j1))
+    random.shuffle(tiles)
+    return tiles[:minefield.mine_count]
+
+
+def seeded_layout(minefield: Minefield, remove_this: tuple[int, int]) -> list[int]:
+    return minefield.layout(minefield.board.index(*remove_this), random.getrandbits(32))
+
+
+def full_set_mines(minefield: Minefield, remove_this: tuple[int, int]) -> None:
+    minefield.set_mines(remove_this)
+
+
+def board_metrics(minefield: Minefield, remove_this: tuple[int, int]) -> None:
+    measure(minefield.board)
+
+
+def time_it(function, minefield: Minefield, repeat: int) -> float:
+    """Get the median time of a few runs, each with a different first click."""
+    times = []
+    for _ in range(repeat):
+        first = minefield.board.coordinate(random.choice(minefield.board.indices))
+        start = time.perf_counter()
+        function(minefield, first)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5, help='runs per size (the median is shown)')
+    args = parser.parse_args()
+    print(f'{"tiles":>9} {"mines":>8} {"legacy":>10} {"seeded":>10} {"speedup":>8} {"set_mines":>10} {"metrics":>10}')
+    for width, height in SIZES:
+        area = width*height - (width-1)//2
+        minefield = Minefield(width, height, int(area * DENSITY))
+        minefield.init()
+        legacy = time_it(legacy_layout, minefield, args.repeat)
+        seeded = time_it(seeded_layout, minefield, args.repeat)
+        # the whole thing, including the tiles and counts
+        full = time_it(full_set_mines, minefield, args.repeat)
+        metrics = time_it(board_metrics, minefield, args.repeat)
+        print(f'{area:>9} {minefield.mine_count:>8} {legacy*1000:>8.2f}ms {seeded*1000:>8.2f}ms {legacy/seeded:>7.1f}x '
+              f'{full*1000:>8.2f}ms {metrics*1000:>8.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark replaying recorded games with no display: games per second, and bytes per action.
+
+The games are played by the solver (guessing at random when it has to), recorded the same way `CoreGame` records
+them, and written to a file and read back before they're timed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import random
+import time
+
+import replay
+from board import FlagType
+from engine import DIFFICULTIES, Minefield
+from replay import Action, Recording
+from solver import Solver
+
+
+def play(width: int, height: int, mine_count: int) -> Recording:
+    """Play a whole game with the solver, and record it."""
+    minefield = Minefield(width, height, mine_count)
+    minefield.init()
+    recording = Recording(width, height, mine_count)
+    board = minefield.board
+    first = board.coordinate(random.choice(board.indices))
+    minefield.open_tile(*first)
+    recording.set_board(minefield)
+    recording.add(0, Action.OPEN, *first)
+    solver = Solver(minefield)
+    tick = 0
+    while True:
+        solver.notify(minefield.changed_tiles)
+        minefield.changed_tiles.clear()
+        tick += random.randrange(5, 60)
+        move = solver.next_move()
+        if move is None:
+            closed = [index for index in board.indices if board.flags[index] == FlagType.NONE_CLOSED]
+            move = random.choice(closed), False
+        index, is_mine = move
+        i, j = board.coordinate(index)
+        if is_mine:
+            minefield.flag_tile(i, j)
+            recording.add(tick, Action.FLAG, i, j)
+            continue
+        recording.add(tick, Action.OPEN, i, j)
+        if not minefield.open_tile(i, j) or minefield.check_victory():
+            return recording
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--games', type=int, default=2000, help='games per difficulty')
+    parser.add_argument('difficulties', nargs='*', default=list(DIFFICULTIES))
+    args = parser.parse_args()
+    for name in args.difficulties:
+        recordings = [play(*DIFFICULTIES[name]) for _ in range(args.games)]
+        file = io.BytesIO()
+        for recording in recordings:
+            file.write(recording.to_bytes())
+        actions = sum(len(recording) for recording in recordings)
+        size = file.tell()
+        file.seek(0)
+        start = time.perf_counter()
+        results = [replay.replay(recording) for recording in replay.read(file)]
+        elapsed = time.perf_counter() - start
+        won = sum(result.won for result in results)
+        print(f'{name:>8}: {len(results)/elapsed:8.0f} games/s  {actions/elapsed:9.0f} actions/s  '
+              f'{size/actions:5.1f} bytes/action (with the header)  won {won}/{len(results)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""Load test `server` with 1k, 10k and 50k sessions playing at once: actions per second, and latency percentiles.
+
+The server runs in its own process. Every session plays random games: it opens (or chords) random tiles, flags some,
+and starts a new game when one ends, sending its next action as soon as the last one is answered. The sessions are
+spread over `--connections` connections in `--processes` client processes. Only the actions answered after
+`--warmup` seconds count, and the latency is from sending an action to reading its response.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import random
+import statistics
+import subprocess
+import sys
+import time
+from array import array
+
+from engine import DIFFICULTIES, Minefield
+from server import HOST, REQUEST, RESPONSE, TILE, Op, Status
+
+
+LEVELS = [1000, 10000, 50000]
+FLAGS = 0.15  # of the moves that aren't new games
+
+
+class Player(asyncio.Protocol):
+    """The sessions on one connection. Each one always has exactly one request waiting for its response."""
+
+    def __init__(self, first: int, count: int, difficulty: int, coordinates: list[tuple[int, int]],
+                 measure_from: float, stop_at: float, done: asyncio.Future):
+        self.sessions = range(first, first + count)
+        self.difficulty = difficulty
+        self.coordinates = coordinates
+        self.measure_from = measure_from
+        self.stop_at = stop_at
+        self.done = done
+        self.sent: dict[int, float] = {}  # by session
+        self.latencies = array('d')
+        self.transport: asyncio.Transport = None
+        self.buffer = b''
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        self.transport = transport
+        now = time.perf_counter()
+        for session in self.sessions:
+            self.sent[session] = now
+        transport.write(b''.join(REQUEST.pack(session, Op.NEW, self.difficulty, 0) for session in self.sessions))
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        if not self.done.done():
+            self.done.set_result(None)
+
+    def data_received(self, data: bytes) -> None:
+        buffer = self.buffer + data if self.buffer else data
+        now = time.perf_counter()
+        stopping = now >= self.stop_at
+        measuring = now >= self.measure_from and not stopping
+        sent = self.sent
+        requests = []
+        position = 0
+        while len(buffer) - position >= RESPONSE.size:
+            session, status, _, tiles = RESPONSE.unpack_from(buffer, position)
+            end = position + RESPONSE.size + tiles*TILE.size
+            if end > len(buffer):
+                break
+            position = end
+            if measuring:
+                self.latencies.append(now - sent[session])
+            if stopping:
+                del sent[session]
+                continue
+            sent[session] = now
+            if status != Status.PLAYING:
+                requests.append(REQUEST.pack(session, Op.NEW, self.difficulty, 0))
+            else:
+                op = Op.FLAG if random.random() < FLAGS else Op.OPEN
+                requests.append(REQUEST.pack(session, op, *random.choice(self.coordinates)))
+        self.buffer = buffer[position:]
+        if requests:
+            self.transport.write(b''.join(requests))
+        elif not sent:
+            self.transport.close()
+
+
+async def play(port: int, sessions: int, connections: int, difficulty: int, warmup: float,
+               duration: float) -> tuple[int, array]:
+    """Play on `sessions` sessions until the time is up. Return the actions answered while measuring, and the latency
+    of each one.
+    """
+    loop = asyncio.get_running_loop()
+    minefield = Minefield(*list(DIFFICULTIES.values())[difficulty])
+    minefield.init()
+    coordinates = list(minefield.board.keys())
+    start = time.perf_counter()
+    players = []
+    for number in range(connections):
+        first = sessions * number // connections
+        count = sessions * (number + 1) // connections - first
+        player = Player(first, count, difficulty, coordinates, start + warmup, start + warmup + duration,
+                        loop.create_future())
+        await loop.create_connection(lambda: player, HOST, port)
+        players.append(player)
+    await asyncio.gather(*(player.done for player in players))
+    latencies = array('d')
+    for player in players:
+        latencies.extend(player.latencies)
+    return len(latencies), latencies
+
+
+def run_client(arguments: tuple) -> tuple[int, array]:
+    return asyncio.run(play(*arguments))
+
+
+def start_server() -> tuple[subprocess.Popen, int]:
+    """Start the server on any free port, and wait until it's listening."""
+    process = subprocess.Popen([sys.executable, 'server.py', '--port', '0'], stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()  # "serving on HOST:PORT"
+    return process, int(line.rsplit(':', 1)[1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--difficulty', choices=list(DIFFICULTIES), default='easy')
+    parser.add_argument('--connections', type=int, default=100, help='in total, for every number of sessions')
+    parser.add_argument('--processes', type=int, default=1, help='client processes')
+    parser.add_argument('--warmup', type=float, default=5.0, help='seconds')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds measured')
+    parser.add_argument('sessions', type=int, nargs='*', default=LEVELS)
+    args = parser.parse_args()
+    difficulty = list(DIFFICULTIES).index(args.difficulty)
+    server, port = start_server()
+    try:
+        for sessions in args.sessions:
+            processes = min(args.processes, sessions)
+            connections = max(processes, min(args.connections, sessions))
+            jobs = []
+            for number in range(processes):
+                # each process gets its share of the sessions and connections
+                jobs.append((port, sessions * (number + 1) // processes - sessions * number // processes,
+                             connections * (number + 1) // processes - connections * number // processes,
+                             difficulty, args.warmup, args.duration))
+            with multiprocessing.Pool(processes) as pool:
+                results = pool.map(run_client, jobs)
+            actions = sum(count for count, _ in results)
+            latencies = sorted(latency for _, process_latencies in results for latency in process_latencies)
+            p50, p99 = (latencies[int(fraction * (len(latencies) - 1))] for fraction in (0.5, 0.99))
+            print(f'{sessions:>6} sessions: {actions / args.duration:8.0f} actions/s  latency p50 {p50*1e3:7.2f} ms  '
+                  f'p99 {p99*1e3:7.2f} ms  max {latencies[-1]*1e3:7.2f} ms  '
+                  f'(mean {statistics.fmean(latencies)*1e3:.2f} ms)')
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    main()
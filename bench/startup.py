@@ -0,0 +1,118 @@
+"""Time from launching the game to the first menu frame on the display, and from clicking a difficulty to the first
+frame of the board.
+
+Each run is a new process (with SDL's dummy video driver), which exits on the first `display.update`, so this is
+everything: starting Python, imports, opening the window and drawing the menu.
+Run with `python -m bench.startup` from the repository root. `--imports` shows the slowest imports instead.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+# runs in the new process: `python main.py`, stopping at the first frame that reaches the display
+CHILD = '''
+import os
+import sys
+import time
+
+import main  # first, like `python main.py`
+
+
+def first_frame(*args):
+    print(time.perf_counter() - START)
+    sys.stdout.flush()
+    os._exit(0)
+
+
+START = float(sys.argv[1])
+main.pygame.display.update = first_frame
+main.Main().main()
+'''
+
+# same, but from clicking "Easy Difficulty" (on a menu that's already drawn) to the first frame of the board
+NEW_GAME = '''
+import os
+import sys
+import time
+
+import main
+import pygame
+from game import Game, Playing
+
+
+def first_frame(*args):
+    if game.playing != Playing.CORE_GAME:
+        return
+    print(time.perf_counter() - start)
+    sys.stdout.flush()
+    os._exit(0)
+
+
+pygame.init()
+canvas = pygame.display.set_mode((800, 600))
+game = Game(main.Main(), canvas)
+game.tick_loop()
+pygame.display.update = first_frame
+start = time.perf_counter()
+pygame.mouse.get_pos = lambda: game.easy_rect.center
+game.handle_event(pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=game.easy_rect.center))
+first_frame(game.tick_loop())
+'''
+
+
+def child_env() -> dict[str, str]:
+    return {**os.environ, 'SDL_VIDEODRIVER': 'dummy', 'SDL_AUDIODRIVER': 'dummy'}
+
+
+def time_launch() -> float:
+    """Seconds from starting the process to the first menu frame."""
+    start = time.perf_counter()
+    # perf_counter is system-wide on Linux (CLOCK_MONOTONIC), so the child can measure from here
+    output = subprocess.run([sys.executable, '-c', CHILD, repr(start)], env=child_env(), capture_output=True,
+                            text=True, check=True).stdout
+    return float(output.split()[-1])
+
+
+def time_new_game() -> float:
+    output = subprocess.run([sys.executable, '-c', NEW_GAME], env=child_env(), capture_output=True, text=True,
+                            check=True).stdout
+    return float(output.split()[-1])
+
+
+def slowest_imports(count: int) -> list[str]:
+    """Get the imports with the most cumulative time, from `python -X importtime`."""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD, repr(time.perf_counter())],
+                            env=child_env(), capture_output=True, text=True).stderr
+    imports = []
+    for line in stderr.splitlines():
+        if line.startswith('import time:') and '|' in line and 'cumulative' not in line:
+            _, cumulative, name = line.split('|')
+            imports.append((int(cumulative), name.rstrip()))
+    imports.sort(reverse=True)
+    return [f'{cumulative/1000:8.1f} ms  {name}' for cumulative, name in imports[:count]]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m bench.startup', description=__doc__)
+    parser.add_argument('--runs', type=int, default=15)
+    parser.add_argument('--imports', type=int, nargs='?', const=25, metavar='COUNT',
+                        help='show the slowest imports instead')
+    args = parser.parse_args()
+    if args.imports:
+        print('\n'.join(slowest_imports(args.imports)))
+        return
+    for name, timer in [('launch to menu', time_launch), ('click to board', time_new_game)]:
+        times = sorted(timer() for _ in range(args.runs))
+        print(f'{name:<16} median {statistics.median(times)*1e3:7.1f}ms   min {times[0]*1e3:7.1f}ms   '
+              f'max {times[-1]*1e3:7.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
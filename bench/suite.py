@@ -0,0 +1,239 @@
+"""Times the hot paths of the game for every difficulty (and some bigger boards), and compares them to a baseline.
+
+Everything runs headless: rendering goes to an offscreen surface with SDL's dummy video driver.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+import pygame  # noqa: E402
+
+from board import FlagType, TileType  # noqa: E402
+from core import CoreGame  # noqa: E402
+from engine import DIFFICULTIES  # noqa: E402
+from main import Main  # noqa: E402
+
+
+# scaled-up Hard boards (same density)
+SCALED = {
+    'hard-x4': (61, 33, 440),
+    'hard-x16': (121, 65, 1760),
+    'hard-x64': (241, 129, 7040),
+}
+# the biggest custom board, only run when asked for (setting it up takes a while)
+HUGE = {
+    'huge': (999, 1000, 215000),
+}
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+TOLERANCE = 0.25  # slower than the baseline by more than this (at the median) is a regression
+NOISE_FLOOR = 20e-6  # but differences smaller than this (in seconds) are just noise
+MIN_RUNS = 5
+
+
+@dataclass
+class Result:
+    name: str
+    size: str
+    runs: int
+    ops_per_sec: float
+    p50: float  # all in seconds
+    p90: float
+    p99: float
+    max: float
+
+
+def percentile(times: list[float], fraction: float) -> float:
+    """Get a percentile of sorted times, by nearest rank."""
+    return times[min(len(times)-1, int(fraction * len(times)))]
+
+
+def measure(name: str, size: str, setup: Callable[[], object], run: Callable[[object], object],
+            min_time: float, max_runs: int) -> Result:
+    """Call `run(setup())` until `min_time` is spent in `run` (or `max_runs`), only timing `run`."""
+    times = []
+    while len(times) < MIN_RUNS or (sum(times) < min_time and len(times) < max_runs):
+        state = setup()
+        start = time.perf_counter()
+        run(state)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return Result(name, size, len(times), len(times) / sum(times), percentile(times, 0.5), percentile(times, 0.9),
+                  percentile(times, 0.99), times[-1])
+
+
+#
+#
+#
+
+
+def new_game(main: Main, canvas: pygame.Surface, width: int, height: int, mine_count: int) -> CoreGame:
+    core = CoreGame(main, canvas, width, height, mine_count)
+    core.init()
+    return core
+
+
+def started_game(main: Main, canvas: pygame.Surface, width: int, height: int, mine_count: int) -> CoreGame:
+    """A game with the mines placed, but nothing opened."""
+    core = new_game(main, canvas, width, height, mine_count)
+    core.minefield.set_mines(core.board.coordinate(random.choice(core.board.indices)))
+    return core
+
+
+def played_game(main: Main, canvas: pygame.Surface, width: int, height: int, mine_count: int) -> CoreGame:
+    """A game partway through: a few openings, and some flags."""
+    core = started_game(main, canvas, width, height, mine_count)
+    board = core.board
+    safe = [index for index in board.indices if board.tiles[index] != TileType.MINE]
+    for index in random.sample(safe, max(1, len(safe) // 20)):
+        core.minefield.open_tile(*board.coordinate(index), clicked_by_user=False)
+    mines = [index for index in board.indices if board.tiles[index] == TileType.MINE]
+    for index in random.sample(mines, len(mines) // 3):
+        core.minefield.flag_tile(*board.coordinate(index))
+    core.draw_all()
+    return core
+
+
+def chord_setup(main: Main, canvas: pygame.Surface, width: int, height: int,
+                mine_count: int) -> tuple[CoreGame, tuple[int, int]]:
+    """A game with an opened number that has all its mines flagged, but closed safe tiles left around it."""
+    while True:
+        core = played_game(main, canvas, width, height, mine_count)
+        board = core.board
+        minefield = core.minefield
+        for index in board.indices:
+            if board.flags[index] != FlagType.OPEN or board.nearby_mines[index] == 0:
+                continue
+            neighbors = board.neighbors(index)
+            if not any(board.flags[n] == FlagType.NONE_CLOSED and board.tiles[n] != TileType.MINE for n in neighbors):
+                continue
+            for neighbor in neighbors:
+                if board.tiles[neighbor] == TileType.MINE and board.flags[neighbor] != FlagType.FLAGGED:
+                    minefield.flag_tile(*board.coordinate(neighbor))
+            return core, board.coordinate(index)
+
+
+def flood_setup(main: Main, canvas: pygame.Surface, width: int, height: int,
+                mine_count: int) -> tuple[CoreGame, tuple[int, int]]:
+    """A game with the mines placed, and an empty tile to click on (so it opens an area)."""
+    core = started_game(main, canvas, width, height, mine_count)
+    board = core.board
+    empty = [index for index in board.indices
+             if board.tiles[index] != TileType.MINE and board.nearby_mines[index] == 0]
+    return core, board.coordinate(random.choice(empty))
+
+
+def click_setup(core: CoreGame) -> pygame.event.Event:
+    # middle click, so it's only the hit testing and never changes the board
+    return pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=2,
+                              pos=(random.randrange(core.main.x_size), random.randrange(core.main.y_size)))
+
+
+def incremental_setup(core: CoreGame) -> CoreGame:
+    """Change one tile, so the next frame only redraws that."""
+    board = core.board
+    closed = [index for index in board.indices if board.flags[index] in {FlagType.NONE_CLOSED, FlagType.FLAGGED}]
+    core.minefield.flag_tile(*board.coordinate(random.choice(closed)))
+    return core
+
+
+def full_redraw_setup(core: CoreGame) -> CoreGame:
+    core.request_redraw()
+    return core
+
+
+def benchmarks(main: Main, canvas: pygame.Surface, size: str, width: int, height: int, mine_count: int,
+               min_time: float, max_runs: int) -> list[Result]:
+    args = main, canvas, width, height, mine_count
+    played = played_game(*args)
+    cases = [
+        ('init', lambda: None, lambda _: new_game(*args)),
+        ('set_mines', lambda: new_game(*args),
+         lambda core: core.minefield.set_mines(core.board.coordinate(random.choice(core.board.indices)))),
+        ('open_tile flood', lambda: flood_setup(*args), lambda state: state[0].open_tile(*state[1])),
+        ('open_tile chord', lambda: chord_setup(*args), lambda state: state[0].open_tile(*state[1])),
+        ('check_victory', lambda: played, lambda core: core.check_victory()),
+        ('handle_click', lambda: click_setup(played), lambda event: played.handle_click(event)),
+        ('draw_all full', lambda: full_redraw_setup(played), lambda core: core.draw_all()),
+        ('draw_all one tile', lambda: incremental_setup(played), lambda core: core.draw_all()),
+    ]
+    return [measure(name, size, setup, run, min_time, max_runs) for name, setup, run in cases]
+
+
+#
+#
+#
+
+
+def compare(results: list[Result], baseline: dict) -> list[str]:
+    """Get a line for every benchmark that got slower than the baseline by more than `TOLERANCE` (and more than
+    `NOISE_FLOOR`).
+    """
+    old = {(result['name'], result['size']): result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        before = old.get((result.name, result.size))
+        if before is not None and result.p50 - before['p50'] > max(before['p50'] * TOLERANCE, NOISE_FLOOR):
+            regressions.append(f'{result.name} ({result.size}): p50 {before["p50"]*1e3:.3f}ms -> '
+                               f'{result.p50*1e3:.3f}ms ({result.p50/before["p50"]:.2f}x)')
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog='python -m bench', description=__doc__)
+    parser.add_argument('sizes', nargs='*', default=[*DIFFICULTIES, *SCALED],
+                        help=f'difficulties or scaled boards ({", ".join([*DIFFICULTIES, *SCALED, *HUGE])})')
+    parser.add_argument('--min-time', type=float, default=0.3, help='seconds spent timing each benchmark')
+    parser.add_argument('--max-runs', type=int, default=2000, help='most runs of each benchmark')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', metavar='PATH', help='save the results as JSON')
+    parser.add_argument('--baseline', metavar='PATH', default=BASELINE, help='compare against these results')
+    parser.add_argument('--update-baseline', action='store_true', help='save the results as the new baseline')
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    pygame.init()
+    main = Main()
+    canvas = pygame.Surface((main.x_size, main.y_size))
+    sizes = {**DIFFICULTIES, **SCALED, **HUGE}
+    results = []
+    print(f'{"benchmark":<18} {"size":<9} {"runs":>6} {"ops/s":>10} {"p50":>10} {"p90":>10} {"p99":>10}')
+    for size in args.sizes:
+        for result in benchmarks(main, canvas, size, *sizes[size], args.min_time, args.max_runs):
+            results.append(result)
+            print(f'{result.name:<18} {result.size:<9} {result.runs:>6} {result.ops_per_sec:>10.1f} '
+                  f'{result.p50*1e3:>8.3f}ms {result.p90*1e3:>8.3f}ms {result.p99*1e3:>8.3f}ms')
+
+    output = {
+        'python': sys.version.split()[0],
+        'pygame': pygame.version.ver,
+        'machine': platform.platform(),
+        'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'results': [asdict(result) for result in results],
+    }
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(output, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(output, f, indent=2)
+        print(f'saved the baseline to {args.baseline}')
+        return
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f))
+        if regressions:
+            print(f'\n{len(regressions)} regression(s) against {args.baseline}:')
+            print('\n'.join(regressions))
+            sys.exit(1)
+        print(f'\nno regressions against {args.baseline}')
@@ -0,0 +1,90 @@
+"""Benchmark undo and redo against the time of a frame, on boards whose first click opens a big area at once.
+Every board is played a bit past the first click (flags and more openings), then the whole game is undone and redone
+one step at a time, a few times over. The first click is the biggest step, so it's shown by itself, next to how long
+the click took in the first place.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+
+from board import TileType
+from engine import Minefield
+
+
+# width, height, mines: so few mines that the first click opens most of the board
+SIZES = [(101, 100, 30), (201, 200, 100), (501, 500, 500)]
+FRAME = 1 / 60
+
+
+def play(minefield: Minefield, moves: int) -> float:
+    """Open the middle, then make random moves that don't lose. Return how long the first click took."""
+    board = minefield.board
+    start = time.perf_counter()
+    minefield.open_tile(*board.coordinate(board.indices[len(board.indices) // 2]))
+    first_click = time.perf_counter() - start
+    for _ in range(moves):
+        index = random.choice(board.indices)
+        if board.tiles[index] == TileType.MINE:
+            minefield.flag_tile(*board.coordinate(index))
+        else:
+            minefield.open_tile(*board.coordinate(index))
+    return first_click
+
+
+def timed(function, minefield: Minefield) -> tuple[object, float]:
+    """Call `function`, and clear the changed tiles afterwards like a frame would."""
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    minefield.changed_tiles.clear()
+    return result, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--moves', type=int, default=200, help='moves after the first click')
+    parser.add_argument('--repeat', type=int, default=5, help='times to undo and redo the whole game')
+    args = parser.parse_args()
+    for width, height, mine_count in SIZES:
+        minefield = Minefield(width, height, mine_count)
+        minefield.init()
+        minefield.keep_history()
+        first_click = play(minefield, args.moves)
+        minefield.changed_tiles.clear()
+        history = minefield.history
+        history.end()
+        size = history.size
+        steps = len(history.undo_steps)
+        first = len(history.undo_steps[0])
+        undos = []
+        redos = []
+        first_undos = []
+        first_redos = []
+        for _ in range(args.repeat):
+            while True:
+                done, elapsed = timed(minefield.undo, minefield)
+                if not done:
+                    break
+                undos.append(elapsed)
+            first_undos.append(undos[-1])
+            first_redos.append(timed(minefield.redo, minefield)[1])
+            redos.append(first_redos[-1])
+            while True:
+                alive, elapsed = timed(minefield.redo, minefield)
+                if alive is None:
+                    break
+                redos.append(elapsed)
+        print(f'{width}x{height}: {steps} steps, {size} tile changes, '
+              f'the first click opened {first} in {first_click*1e3:.2f} ms')
+        for name, times, first_times in [('undo', undos, first_undos), ('redo', redos, first_redos)]:
+            first_time = statistics.median(first_times)
+            print(f'    {name}: median {statistics.median(times)*1e6:7.0f} us, first click {first_time*1e3:6.2f} ms '
+                  f'({first_time/FRAME:.0%} of a frame)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""Compact board storage."""
+
+from __future__ import annotations
+
+import enum
+import itertools
+from array import array
+from typing import Iterator
+
+
+NEARBY_TILES = [(1, -1), (-1, 1), (-1, 0), (1, 0), (0, -1), (0, 1)]
+
+
+class FlagType(enum.IntEnum):
+    OPEN = 0  # tile has been opened
+    NONE_CLOSED = 1  # tile is closed and not marked
+    FLAGGED = 2  # tile is flagged
+    QUESTION = 3  # tile is question flagged
+    POST_GAME_LOSS = 4  # shows mines post-game loss (does nothing to safe tiles)
+    POST_GAME_LOSS_CAUSE = 5  # shows the mine you clicked on that made you lose
+
+
+class TileType(enum.IntEnum):
+    NOT_YET_GENERATED = 0
+    SAFE = 1
+    MINE = 2
+
+
+class TileView:
+    """One tile of a `HexBoard`, with the same interface as a standalone tile.
+    Setting `flag` through here doesn't update the neighbor counts, the game always goes through `Minefield`.
+    """
+    __slots__ = ('board', 'index')
+
+    def __init__(self, board: HexBoard, index: int):
+        self.board = board
+        self.index = index
+
+    def __repr__(self) -> str:
+        return f'TileView(tile={self.tile}, flag={self.flag})'
+
+    @property
+    def tile(self) -> TileType:
+        return TileType(self.board.tiles[self.index])
+
+    @tile.setter
+    def tile(self, value: TileType) -> None:
+        self.board.tiles[self.index] = value
+
+    @property
+    def flag(self) -> FlagType:
+        return FlagType(self.board.flags[self.index])
+
+    @flag.setter
+    def flag(self, value: FlagType) -> None:
+        self.board.flags[self.index] = value
+
+    @property
+    def open_safe(self) -> bool:
+        return self.board.flags[self.index] == FlagType.OPEN
+
+    @property
+    def closed(self) -> bool:
+        return not self.open_safe
+
+    @property
+    def safe(self) -> bool:
+        return self.board.tiles[self.index] != TileType.MINE
+
+    @property
+    def mined(self) -> bool:
+        return not self.safe
+
+    @property
+    def unmarked(self) -> bool:
+        return self.board.flags[self.index] == FlagType.NONE_CLOSED
+
+    @property
+    def flagged(self) -> bool:
+        return self.board.flags[self.index] in {FlagType.FLAGGED, FlagType.QUESTION}
+
+
+class HexBoard:
+    """The tiles of a board, packed into flat byte arrays (one byte per tile per field).
+
+    Game i,j is stored at `index(i, j) = (i - i_min + 1)*stride + (j - j_min + 1)`. There is a ring of invalid cells
+    around the bounding box, so the neighbors of any tile are at the fixed offsets in `neighbor_offsets`, and never
+    wrap around or run off the end. `valid` masks out everything outside the hexagon shape.
+
+    Indexing with an (i, j) tuple gives a `TileView`, so this can still be used like a dict of tiles.
+    """
+    __slots__ = ('i_min', 'i_max', 'j_min', 'j_max', 'stride', 'valid', 'tiles', 'flags',
+                 'nearby_mines', 'nearby_flagged', 'nearby_questions', 'neighbor_offsets', 'indices')
+
+    def __init__(self, i_min: int, i_max: int, j_min: int, j_max: int):
+        self.i_min = i_min
+        self.i_max = i_max
+        self.j_min = j_min
+        self.j_max = j_max
+        self.stride = j_max - j_min + 3
+        size = (i_max - i_min + 3) * self.stride
+        self.valid = bytearray(size)
+        self.tiles = bytearray([TileType.NOT_YET_GENERATED]) * size
+        self.flags = bytearray([FlagType.NONE_CLOSED]) * size
+        # counts of the (up to 6) surrounding tiles, so they don't have to be looked up every time
+        self.nearby_mines = bytearray(size)
+        self.nearby_flagged = bytearray(size)
+        self.nearby_questions = bytearray(size)
+        self.neighbor_offsets = tuple(i_off*self.stride + j_off for i_off, j_off in NEARBY_TILES)
+        self.indices = array('i')  # every valid index, in order
+
+    def add_row(self, i: int, j_min: int, j_max: int) -> None:
+        """Add the tiles i,j_min through i,j_max (inclusive) to the board."""
+        start = self.index(i, j_min)
+        end = self.index(i, j_max) + 1
+        self.valid[start:end] = b'\x01' * (end - start)
+        self.indices.extend(range(start, end))
+
+    def index(self, i: int, j: int) -> int:
+        """Convert game i,j to an index. Only meaningful if i,j is on the board."""
+        return (i - self.i_min + 1)*self.stride + (j - self.j_min + 1)
+
+    def coordinate(self, index: int) -> tuple[int, int]:
+        """Convert an index back to game i,j."""
+        row, column = divmod(index, self.stride)
+        return row - 1 + self.i_min, column - 1 + self.j_min
+
+    def neighbors(self, index: int) -> list[int]:
+        """Get the indices of the tiles around a tile."""
+        valid = self.valid
+        return [index + offset for offset in self.neighbor_offsets if valid[index + offset]]
+
+    def symmetries(self) -> list[array]:
+        """Get every symmetry of the board, as a mapping from each index to the index it moves to.
+        The hex grid has 12 (linear) symmetries, the 2x2 matrices that shuffle `NEARBY_TILES` around. Each one is
+        tried with the translation that lines the board back up, and kept if the board lands exactly on itself.
+        The identity is always first.
+        """
+        coordinates = list(self)
+        coordinate_set = set(coordinates)
+        corner = min(coordinates)
+        neighbors = set(NEARBY_TILES)
+        symmetries = []
+        for a, b, c, d in itertools.product((1, 0, -1), repeat=4):
+            if {(a*i + b*j, c*i + d*j) for i, j in NEARBY_TILES} != neighbors:
+                continue
+            moved = [(a*i + b*j, c*i + d*j) for i, j in coordinates]
+            moved_corner = min(moved)
+            i_shift, j_shift = corner[0] - moved_corner[0], corner[1] - moved_corner[1]
+            moved = [(i + i_shift, j + j_shift) for i, j in moved]
+            if not coordinate_set.issuperset(moved):
+                continue
+            mapping = array('i', range(len(self.valid)))
+            for index, (i, j) in zip(self.indices, moved):
+                mapping[index] = self.index(i, j)
+            symmetries.append(mapping)
+        identity = array('i', range(len(self.valid)))
+        symmetries.sort(key=lambda mapping: mapping != identity)
+        return symmetries
+
+    # dict-like interface, keyed by (i, j)
+
+    def __contains__(self, coordinate: tuple[int, int]) -> bool:
+        i, j = coordinate
+        if not (self.i_min <= i <= self.i_max and self.j_min <= j <= self.j_max):
+            return False
+        return self.valid[self.index(i, j)] == 1
+
+    def __getitem__(self, coordinate: tuple[int, int]) -> TileView:
+        if coordinate not in self:
+            raise KeyError(coordinate)
+        return TileView(self, self.index(*coordinate))
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        return map(self.coordinate, self.indices)
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def keys(self) -> Iterator[tuple[int, int]]:
+        return iter(self)
+
+    def values(self) -> Iterator[TileView]:
+        return (TileView(self, index) for index in self.indices)
+
+    def items(self) -> Iterator[tuple[tuple[int, int], TileView]]:
+        return ((self.coordinate(index), TileView(self, index)) for index in self.indices)
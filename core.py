@@ -3,23 +3,111 @@
 from __future__ import annotations
 
 import math
-import random
 from dataclasses import dataclass, field
 from typing import TYPE_CHECKING
 
 import pygame
 
-from utils import FlagType, Tile, draw_hexagon, TileType, draw_centered_text, draw_right_align_text
+import generation
+from board import FlagType, HexBoard, TileType
+from engine import Minefield
+from fonts import NERD, SERIF, get_font
+from pregen import PregenPool
+from replay import Action, Recording
+from solver import Solver
+from utils import (HexagonAtlas, centered_text_blit, clear_canvas, draw_right_align_text,
+                   render_text)
 
 if TYPE_CHECKING:
     from main import Main
+    from probability import ProbabilityEngine
 
 
-NEARBY_TILES = [(1, -1), (-1, 1), (-1, 0), (1, 0), (0, -1), (0, 1)]
 MINE_COLOR = {1: 0xf9ffc1ff, 2: 0x82d48cff, 3: 0xff6565ff, 4: 0x6e44b0ff, 5: 0x005a88ff, 6: 0x340d0dff}
 HEX_COLOR = {0: 0xffffff, 1: 0xeaff28, 2: 0x308d3c, 3: 0xff3232, 4: 0x352054, 5: 0x00273c, 6: 0x340d0d}
+HINT_COLOR = {False: 0x55aa55, True: 0xaa55aa}  # by whether it's a mine
+# probability heat map, from certainly safe (green) to certainly a mine (red), in steps of 10%
+HEAT_COLORS = [(round(0x30 + 0x90*step/10) << 16) | (round(0xa0 - 0x70*step/10) << 8) | 0x30 for step in range(11)]
+# every hexagon color drawn on the board: opened tiles, post-game loss (and the cause), flagged, closed, hints, heat
+TILE_COLORS = [*HEX_COLOR.values(), 0xff5555, 0xaa0000, 0xffa2a2, 0x404040, *HINT_COLOR.values(), *HEAT_COLORS]
 
 BORDER_BUFFER = 2.75
+# the camera never zooms out further than this, so the number of tiles drawn every frame only depends on the window
+# (anything smaller than this can't fit the labels anyway)
+MIN_RADIUS = 12.0
+MAX_RADIUS = 60.0
+HUD_TOP = 5  # where the mine count and the timer are drawn
+# the board is never drawn over the mine count and the timer, whose text is `HUD_TOP` plus the line size of
+# `font_nerd_20` (27) tall
+HUD_HEIGHT = 32
+
+
+@dataclass(frozen=True)
+class BoardLayout:
+    """The position and size of the hexagons on the canvas, for one window size and camera.
+    Positions are in board units: u = sqrt3/2 * j and v = i + j/2, which is a hexagon center every `size` pixels.
+    The camera puts the board point `center` (in board units) in the middle of the window.
+    """
+    x_size: int
+    y_size: int
+    hexagon_radius: float
+    center: tuple[float, float]
+    size: float
+    x_0: float
+    y_0: float
+
+    @staticmethod
+    def fit_radius(main: Main, width: int, height: int) -> float:
+        """Get the radius that fits the whole board in the window."""
+        # need to subtract BORDER_BUFFER/2 because there's (approximately) 1 border buffer for each hexagon
+        # both of these are approximations, but they get close enough that the difference is irrelevant
+        x_limit = (main.x_size - 50) / ((width-1)*1.5 + 2) - BORDER_BUFFER/2
+        y_limit = (main.y_size - 140) / (height * 1.7320508075688772) - BORDER_BUFFER/2
+        return min(x_limit, y_limit)
+
+    @classmethod
+    def compute(cls, main: Main, hexagon_radius: float, center: tuple[float, float]) -> BoardLayout:
+        # Slightly larger than 2*apothem, so they're almost touching but not quite.
+        size = 1.7320508075688772*hexagon_radius + BORDER_BUFFER
+        # Find the X,Y location of game 0,0 (which is at 0,0 in board units), so `center` lands in the middle.
+        x_0 = main.x_center - size*center[0]
+        y_0 = main.y_center - size*center[1]
+        return cls(main.x_size, main.y_size, hexagon_radius, center, size, x_0, y_0)
+
+    def to_canvas(self, game_i: int, game_j: int) -> tuple[float, float]:
+        """Convert game i,j to canvas x,y."""
+        # Since `i` is (0; 1) and `j` is (sqrt3/2; 1/2), we matrix multiply.
+        x = self.x_0 + self.size * (0.8660254037844386*game_j)
+        y = self.y_0 + self.size * (game_i + 0.5*game_j)
+        return x, y
+
+    def visible(self, board: HexBoard) -> list[int]:
+        """Get the indices of every tile that's at least partly in the window (below the HUD).
+        Only the tiles in the window are looked at, so this is as fast on a huge board as on a small one.
+        """
+        margin = self.hexagon_radius + 3  # the sprites are a bit bigger than the hexagon
+        column = 0.8660254037844386*self.size
+        j_low = max(board.j_min, math.ceil((-margin - self.x_0) / column))
+        j_high = min(board.j_max, math.floor((self.x_size + margin - self.x_0) / column))
+        i_top = (HUD_HEIGHT - margin - self.y_0) / self.size
+        i_bottom = (self.y_size + margin - self.y_0) / self.size
+        valid = board.valid
+        stride = board.stride
+        indices = []
+        for j in range(j_low, j_high+1):
+            # every column is a range of i, which is shifted by j/2
+            i_low = max(board.i_min, math.ceil(i_top - 0.5*j))
+            i_high = min(board.i_max, math.floor(i_bottom - 0.5*j))
+            if i_low > i_high:
+                continue
+            start = board.index(i_low, j)
+            indices.extend(index for index in range(start, start + (i_high-i_low+1)*stride, stride) if valid[index])
+        return indices
+
+    def is_visible(self, x: float, y: float) -> bool:
+        """Check if a hexagon centered at canvas x,y is at least partly in the window (below the HUD)."""
+        margin = self.hexagon_radius + 3
+        return -margin < x < self.x_size + margin and HUD_HEIGHT - margin < y < self.y_size + margin
 
 
 @dataclass
@@ -29,208 +117,157 @@ class CoreGame:
     width: int
     height: int
     mine_count: int
+    no_guess: bool = False  # only generate boards that can be solved without guessing
+    pool: PregenPool = None  # ready layouts, if any
+    atlas: HexagonAtlas = None  # shared between games, so it doesn't have to be rendered again (made if not given)
 
-    board: dict[tuple[int, int], Tile] = field(init=False, default_factory=dict)
-    mines_set: bool = field(init=False, default=False)
+    minefield: Minefield = field(init=False)
     tick_start: int = field(init=False, default=None)
     frozen_timer_ticks: int = field(init=False, default=None)
     game_won: bool = field(init=False, default=False)  # managed by other classes
-
-    font: pygame.font.Font = field(init=False)
-    font_nerd_16: pygame.font.Font = field(init=False)
-    font_nerd_20: pygame.font.Font = field(init=False)
-    font_nerd: pygame.font.Font = field(init=False)
-    font_nerd_28: pygame.font.Font = field(init=False)
-    font_nerd_34: pygame.font.Font = field(init=False)
+    recording: Recording = field(init=False, default=None)  # every action, made again for each game
+    # something was undone, or the solver helped (hints or auto-play), so the game doesn't count
+    practice: bool = field(init=False, default=False)
+    _layout: BoardLayout = field(init=False, default=None)
+    # the camera, or None to fit the board to the window (as well as `MIN_RADIUS` allows) and center it
+    camera_radius: float = field(init=False, default=None)
+    camera_center: tuple[float, float] = field(init=False, default=None)  # in board units, see `BoardLayout`
+    solver: Solver = field(init=False, default=None)  # only created once a hint is asked for
+    hint: tuple[int, bool] = field(init=False, default=None)  # (index, is it a mine)
+    probabilities: ProbabilityEngine = field(init=False, default=None)  # only created for the heat map
+    show_probabilities: bool = field(init=False, default=False)
+    mine_probabilities: dict[int, float] = field(init=False, default_factory=dict)  # next to the numbers
+    interior_probability: float = field(init=False, default=0.0)  # everything else that's closed
+
+    # rendering state, so that only what changed is redrawn every frame
+    full_redraw: bool = field(init=False, default=True)
+    hud_text: tuple[str, str] = field(init=False, default=None)
+    hud_rects: list[pygame.Rect] = field(init=False, default_factory=list)
 
     def __post_init__(self):
-        self.font = pygame.font.Font('assets/liberationserif.ttf', 24)
-        self.font_nerd_16 = pygame.font.Font('assets/jetbrainsmononerd.ttf', 16)
-        self.font_nerd_20 = pygame.font.Font('assets/jetbrainsmononerd.ttf', 20)
-        self.font_nerd = pygame.font.Font('assets/jetbrainsmononerd.ttf', 24)
-        self.font_nerd_28 = pygame.font.Font('assets/jetbrainsmononerd.ttf', 28)
-        self.font_nerd_34 = pygame.font.Font('assets/jetbrainsmononerd.ttf', 34)
+        self.minefield = Minefield(self.width, self.height, self.mine_count)
+        if self.atlas is None:
+            self.atlas = HexagonAtlas(self.canvas)
+
+    @property
+    def board(self) -> HexBoard:
+        return self.minefield.board
+
+    @property
+    def mines_set(self) -> bool:
+        return self.minefield.mines_set
+
+    # fonts are shared by every game, and only loaded when something is drawn with them
+
+    @property
+    def font(self) -> pygame.font.Font:
+        return get_font(SERIF, 24)
+
+    @property
+    def font_nerd_16(self) -> pygame.font.Font:
+        return get_font(NERD, 16)
+
+    @property
+    def font_nerd_20(self) -> pygame.font.Font:
+        return get_font(NERD, 20)
+
+    @property
+    def font_nerd(self) -> pygame.font.Font:
+        return get_font(NERD, 24)
+
+    @property
+    def font_nerd_28(self) -> pygame.font.Font:
+        return get_font(NERD, 28)
+
+    @property
+    def font_nerd_34(self) -> pygame.font.Font:
+        return get_font(NERD, 34)
+
+    @property
+    def layout(self) -> BoardLayout:
+        """Where the board goes on the canvas. Only recomputed when the window size or the camera changes."""
+        radius = self.camera_radius
+        if radius is None:
+            radius = max(MIN_RADIUS, BoardLayout.fit_radius(self.main, self.width, self.height))
+        center = self.camera_center
+        if center is None:
+            u_max, v_max = self._board_extent()
+            center = u_max/2, v_max/2
+        layout = self._layout
+        if layout is None or layout.x_size != self.main.x_size or layout.y_size != self.main.y_size \
+                or layout.hexagon_radius != radius or layout.center != center:
+            layout = self._layout = BoardLayout.compute(self.main, radius, center)
+        return layout
 
     @property
     def x_0(self) -> float:
-        """Find the X location of the top-left hexagon to center the board."""
-        # this one is more complicated
-        # calculate the X using the J
-        center_j = (self.width-1) // 2
-        x_off = self.size * (0.8660254037844386 * center_j)
-        return self.main.x_center - x_off
+        return self.layout.x_0
 
     @property
     def y_0(self) -> float:
-        """Find the Y location of the top-left hexagon to center the board."""
-        # the line through the middle will always have (self.height - 1) hexagons
-        # distance to the edge of the middle (smaller column) == center point of big column
-        return self.main.y_center - self.size * (self.height-1)/2
+        return self.layout.y_0
 
     @property
     def hexagon_radius(self) -> float:
-        # need to subtract BORDER_BUFFER/2 because there's (approximately) 1 border buffer for each hexagon
-        # both of these are approximations, but they get close enough that the difference is irrelevant
-        x_limit = (self.main.x_size - 50) / ((self.width-1)*1.5 + 2) - BORDER_BUFFER/2
-        y_limit = (self.main.y_size - 140) / (self.height * 1.7320508075688772) - BORDER_BUFFER/2
-        return min(x_limit, y_limit)
+        return self.layout.hexagon_radius
 
     @property
     def size(self) -> float:
-        return 1.7320508075688772*self.hexagon_radius + BORDER_BUFFER
+        return self.layout.size
+
+    def _board_extent(self) -> tuple[float, float]:
+        """Get the bottom-right corner of the board in board units (the top-left one is 0,0)."""
+        return 0.8660254037844386*(self.width-1), self.height-1
 
     def _to_canvas(self, game_i: int, game_j: int) -> tuple[float, float]:
         """Convert game i,j to canvas x,y."""
-        # Slightly larger than 2*apothem, so they're almost touching but not quite.
-        # Since `i` is (0; 1) and `j` is (sqrt3/2; 1/2), we matrix multiply.
-        x = self.x_0 + self.size * (0.8660254037844386*game_j)
-        y = self.y_0 + self.size * (game_i + 0.5*game_j)
-        return x, y
+        return self.layout.to_canvas(game_i, game_j)
 
     def _to_game(self, canvas_x: int, canvas_y: int) -> tuple[float, float]:
         """Convert canvas x,y to game i,j."""
-        x = (canvas_x - self.x_0) / self.size
-        y = (canvas_y - self.y_0) / self.size
+        layout = self.layout
+        x = (canvas_x - layout.x_0) / layout.size
+        y = (canvas_y - layout.y_0) / layout.size
         # multiply by inverse (-1/sqrt3, 1 ; -2/sqrt3, 0)
         game_i = -0.5773502691896258*x + y
         game_j = 1.1547005383792517*x
         return game_i, game_j
 
-    def _get_nearby_mines(self, i: int, j: int) -> int:
-        """Get the nearby mines."""
-        nearby_mine_count = 0
-        for i_off, j_off in NEARBY_TILES:
-            i1 = i + i_off
-            j1 = j + j_off
-            if (i1, j1) in self.board and self.board[(i1, j1)].mined:
-                nearby_mine_count += 1
-        return nearby_mine_count
-
-    def _get_nearby_flagged(self, i: int, j: int) -> int:
-        """Get the nearby flagged tiles."""
-        nearby_flagged_count = 0
-        for i_off, j_off in NEARBY_TILES:
-            i1 = i + i_off
-            j1 = j + j_off
-            if (i1, j1) in self.board and self.board[(i1, j1)].flag == FlagType.FLAGGED:
-                nearby_flagged_count += 1
-        return nearby_flagged_count
-
-    def _no_nearby_question(self, i: int, j: int) -> bool:
-        """Get whether there are no nearby question flags."""
-        for i_off, j_off in NEARBY_TILES:
-            i1 = i + i_off
-            j1 = j + j_off
-            if (i1, j1) in self.board and self.board[(i1, j1)].flag == FlagType.QUESTION:
-                return False
-        return True
-
-    def estimated_mines_remaining(self) -> tuple[int, int, int]:
-        """Get the estimated (flags) count of mines left.
-        Return a tuple of
-            0. the mine count with only full flags
-            1. the mine count also including question flags
-            2. the number of incorrect full flags (NOT including questions)
-        """
-        strict_flags = 0
-        questions = 0
-        incorrect_strict_flags = 0
-        for tile in self.board.values():
-            if tile.flag == FlagType.FLAGGED:
-                strict_flags += 1
-                questions += 1
-                if tile.safe:
-                    incorrect_strict_flags += 1
-            elif tile.flag == FlagType.QUESTION:
-                questions += 1
-        return self.mine_count - strict_flags, self.mine_count - questions, incorrect_strict_flags
-
     #
     #
     #
 
     def init(self) -> None:
-        """Draw and initialize stuff, in-place."""
-        MAIN_WIDTH = self.width - 1
-        MAIN_HEIGHT = self.height - MAIN_WIDTH//2 - 1
-        assert MAIN_WIDTH % 2 == 0
-        # top section
-        for i in range(-MAIN_WIDTH//2, 0):
-            j_min = -2 * i
-            j_max = MAIN_WIDTH
-            for j in range(j_min, j_max+1):
-                self.board[(i, j)] = Tile()
-        # normal section
-        for i in range(0, MAIN_HEIGHT+1):
-            for j in range(0, MAIN_WIDTH+1):
-                self.board[(i, j)] = Tile()
-        # bottom section
-        for i in range(MAIN_HEIGHT+1, MAIN_HEIGHT + MAIN_WIDTH//2 + 1):
-            j_min = 0
-            n = i - MAIN_HEIGHT
-            j_max = MAIN_WIDTH - 2*n
-            for j in range(j_min, j_max+1):
-                self.board[(i, j)] = Tile()
-
-    def set_mines(self, remove_this: tuple[int, int]) -> None:
-        """Set the mines in the board.
-        :remove: denotes what to NOT put a mine on, which is the first tile that was opened
-        """
-        tiles = list(self.board.keys())
-        tiles.remove(remove_this)
-        for i_off, j_off in NEARBY_TILES:
-            i1 = remove_this[0] + i_off
-            j1 = remove_this[1] + j_off
-            if (i1, j1) in self.board:
-                tiles.remove((i1, j1))
-        random.shuffle(tiles)  # shuffle a copy and take the top few
-        for i, coordinate in enumerate(tiles):
-            assert self.board[coordinate].closed
-            self.board[coordinate].tile = TileType.MINE if i < self.mine_count else TileType.SAFE
-
-    #
-    #
-    #
-
-    def show_all_mines_winning(self) -> None:
-        """Shows all mines for a win. All mined locations are flagged."""
-        for tile in self.board:
-            if self.board[tile].mined:
-                assert self.board[tile].closed
-                self.board[tile].flag = FlagType.FLAGGED
-
-    def show_all_mines_losing(self) -> None:
-        """Shows all mines for a loss."""
-        for tile in self.board:
-            if self.board[tile].mined:
-                if self.board[tile].flag == FlagType.QUESTION:
-                    self.board[tile].flag = FlagType.FLAGGED
-                elif self.board[tile].flag not in {FlagType.FLAGGED, FlagType.POST_GAME_LOSS_CAUSE}:
-                    # POST_GAME_LOSS_CAUSE was set already, and correctly flagged mines keep their flags
-                    self.board[tile].flag = FlagType.POST_GAME_LOSS
+        """Initialize the board, in-place."""
+        self.minefield.init()
+        self.minefield.keep_history()
+        self.recording = Recording(self.width, self.height, self.mine_count, self.no_guess)
+        self.practice = False
+        self._layout = None
+        self.camera_radius = None
+        self.camera_center = None
+        self.solver = None
+        self.hint = None
+        self.probabilities = None
 
     def check_victory(self) -> bool:
         """Check if you win or not."""
-        opened = len([None for tile in self.board if self.board[tile].open_safe])
-        area = self.width*self.height - (self.width-1)//2
-        return opened == area - self.mine_count
+        return self.minefield.check_victory()
 
     def handle_victory(self) -> None:
         """Handle a win."""
-        self.show_all_mines_winning()
+        self.minefield.show_all_mines_winning()
 
     def handle_defeat(self) -> None:
         """Handle a loss."""
-        self.show_all_mines_losing()
+        self.minefield.show_all_mines_losing()
 
     #
 
-    def draw_all(self, game_ended: bool = False) -> None:
-        """Draw the tiles.
-        :show_flagged_incorrect: After finishing the game, show incorrect flags.
-        """
+    def _hud_texts(self, game_ended: bool) -> tuple[str, str]:
+        """Get the mine count and timer text."""
         # mine count
-        strict_mines, question_mines, incorrectly_flagged = self.estimated_mines_remaining()
+        strict_mines, question_mines, incorrectly_flagged = self.minefield.estimated_mines_remaining()
         if game_ended:
             # when winning, the win handler flags everything and this should be zero
             # when losing, this will display the number of undiscovered mines (how close you were to winning)
@@ -239,130 +276,396 @@ class CoreGame:
             mine_count_text = f'{strict_mines} \ufb8f'
         else:  # only show if different and if there are still mines left that weren't strict flagged
             mine_count_text = f'{strict_mines} ({question_mines}) \ufb8f'
-        self.canvas.blit(self.font_nerd_20.render(mine_count_text, True, 0x11ff11ff), (5, 5))
         # timer
         if self.tick_start is None:
-            draw_right_align_text(self.canvas, self.font_nerd_20.render('\uf64f', True, 0x5555ffff),
-                                  self.main.x_size-5, 5)
+            time_text = '\uf64f'
         else:
             ticks_passed = self.main.number_tick - self.tick_start if self.frozen_timer_ticks is None  \
                            else self.frozen_timer_ticks
             seconds = ticks_passed // self.main.TPS
             time_text = f'\uf64f {seconds // 60:02d}:{seconds % 60:02d}'
-            draw_right_align_text(self.canvas, self.font_nerd_20.render(time_text, True, 0x5555ffff),
-                                  self.main.x_size-5, 5)
-
-        for (i, j), state in self.board.items():
-            x, y = self._to_canvas(i, j)
-            if state.open_safe and state.mined:
-                raise RuntimeError(f'open & mined tile found @ {i=} {j=}...')
-
-            # post-game (check this first because these checks are more specific)
-
-            if state.flag == FlagType.POST_GAME_LOSS:
-                draw_hexagon(self.canvas, x, y, self.hexagon_radius, 0xff5555)
-                draw_centered_text(self.canvas, self.font_nerd.render('\ufb8f', True, 0xff5555ff), x, y)
-
-            elif state.flag == FlagType.POST_GAME_LOSS_CAUSE:
-                draw_hexagon(self.canvas, x, y, self.hexagon_radius, 0xaa0000)
-                draw_centered_text(self.canvas, self.font_nerd_34.render('\ufb8f', True, 0xaa0000ff), x, y)
-
-            # during game
-
-            elif state.flag == FlagType.QUESTION:
-                # question flagged (& closed) tile
-                draw_hexagon(self.canvas, x, y, self.hexagon_radius, 0xffa2a2)
-                draw_centered_text(self.canvas, self.font_nerd.render('\uf128', True, 0x00aaaaff), x, y)
-                if state.safe and game_ended:
-                    draw_centered_text(self.canvas, self.font_nerd_28.render('\u2717', True, 0xff3333ff), x, y)
-
-            elif state.flag == FlagType.FLAGGED:
-                # flagged (& closed) tile
-                draw_hexagon(self.canvas, x, y, self.hexagon_radius, 0xffa2a2)
-                draw_centered_text(self.canvas, self.font_nerd.render('\uf73f', True, 0x55ffffff), x, y)
-                if state.safe and game_ended:
-                    draw_centered_text(self.canvas, self.font_nerd_28.render('\u2717', True, 0xff3333ff), x, y)
-
-            elif state.closed:
-                # closed (& unmarked) tile
-                draw_hexagon(self.canvas, x, y, self.hexagon_radius, 0x404040)
-
-            elif state.open_safe:
-                # safe & opened tile (the "normal" opened tile in game)
-                nearby_mine_count = self._get_nearby_mines(i, j)
-                draw_hexagon(self.canvas, x, y, self.hexagon_radius, HEX_COLOR[nearby_mine_count])
-                if nearby_mine_count != 0:
-                    draw_centered_text(self.canvas,
-                                       self.font.render(str(nearby_mine_count), True, MINE_COLOR[nearby_mine_count]),
-                                       x, y)
-                else:
-                    draw_centered_text(self.canvas, self.font_nerd_16.render('\ueaab', True, 0x666666ff), x, y)
-
+        return mine_count_text, time_text
+
+    def timeout(self) -> int | None:
+        """Get how long (in ms) until the timer shows the next second, or None if it isn't running."""
+        if self.tick_start is None or self.frozen_timer_ticks is not None:
+            return None
+        tps = self.main.TPS
+        ticks_passed = self.main.number_tick - self.tick_start
+        next_second = self.tick_start + (ticks_passed // tps + 1) * tps
+        return max(0, self.main.tick_to_ms(next_second) - pygame.time.get_ticks())
+
+    def seed_text(self) -> str:
+        """Describe where the mines came from, which is everything needed to play the same board again."""
+        minefield = self.minefield
+        if minefield.seed is None:
+            return ''
+        i, j = self.board.coordinate(minefield.origin)
+        text = f'seed {minefield.seed} from {i},{j}'
+        if minefield.symmetry != 0:
+            text += f' (symmetry {minefield.symmetry})'
+        return text
+
+    def metrics_text(self) -> str:
+        """Describe how hard the board was, and (after a win) how fast and efficiently it was cleared."""
+        metrics = self.minefield.metrics
+        if metrics is None:
+            return ''
+        text = f'3BV {metrics.bbbv} ({metrics.openings} openings)'
+        if self.game_won and self.frozen_timer_ticks:
+            text += f', {metrics.per_second(self.frozen_timer_ticks / self.main.TPS):.2f} 3BV/s, ' \
+                    f'{metrics.efficiency(len(self.recording)):.0%} efficiency'
+        return text
+
+    def _draw_hud(self, game_ended: bool) -> list[pygame.Rect]:
+        """Draw the mine count and timer if they changed. Return the changed areas."""
+        hud_text = self._hud_texts(game_ended)
+        if hud_text == self.hud_text:
+            return []
+        self.hud_text = hud_text
+        mine_count_text, time_text = hud_text
+        dirty = []
+        # the board is only redrawn where it changed, so nothing here can touch it
+        self.canvas.set_clip(pygame.Rect(0, 0, self.main.x_size, HUD_HEIGHT))
+        # erase the old text, which could be wider than the new one
+        for old_rect in self.hud_rects:
+            clear_canvas(self.canvas, old_rect)
+            dirty.append(old_rect)
+        self.hud_rects = [
+            self.canvas.blit(render_text(self.font_nerd_20, mine_count_text, True, 0x11ff11ff), (5, HUD_TOP)),
+            draw_right_align_text(self.canvas, render_text(self.font_nerd_20, time_text, True, 0x5555ffff),
+                                  self.main.x_size-5, HUD_TOP),
+        ]
+        self.canvas.set_clip(None)
+        dirty.extend(self.hud_rects)
+        return dirty
+
+    def _tile_blits(self, index: int, x: float, y: float, game_ended: bool, hexagons: list, labels: list) -> None:
+        """Add the hexagon and labels of one tile, centered at x,y, to the blit batches."""
+        flag = self.board.flags[index]
+        safe = self.board.tiles[index] != TileType.MINE
+        if flag == FlagType.OPEN and not safe:
+            raise RuntimeError(f'open & mined tile found @ {self.board.coordinate(index)}...')
+
+        # post-game (check this first because these checks are more specific)
+
+        if flag == FlagType.POST_GAME_LOSS:
+            hexagons.append(self.atlas.sprite_blit(0xff5555, x, y))
+            labels.append(centered_text_blit(render_text(self.font_nerd, '\ufb8f', True, 0xff5555ff), x, y))
+
+        elif flag == FlagType.POST_GAME_LOSS_CAUSE:
+            hexagons.append(self.atlas.sprite_blit(0xaa0000, x, y))
+            labels.append(centered_text_blit(render_text(self.font_nerd_34, '\ufb8f', True, 0xaa0000ff), x, y))
+
+        # during game
+
+        elif flag == FlagType.QUESTION:
+            # question flagged (& closed) tile
+            hexagons.append(self.atlas.sprite_blit(0xffa2a2, x, y))
+            labels.append(centered_text_blit(render_text(self.font_nerd, '\uf128', True, 0x00aaaaff), x, y))
+            if safe and game_ended:
+                labels.append(centered_text_blit(render_text(self.font_nerd_28, '\u2717', True, 0xff3333ff), x, y))
+
+        elif flag == FlagType.FLAGGED:
+            # flagged (& closed) tile
+            hexagons.append(self.atlas.sprite_blit(0xffa2a2, x, y))
+            labels.append(centered_text_blit(render_text(self.font_nerd, '\uf73f', True, 0x55ffffff), x, y))
+            if safe and game_ended:
+                labels.append(centered_text_blit(render_text(self.font_nerd_28, '\u2717', True, 0xff3333ff), x, y))
+
+        elif flag == FlagType.NONE_CLOSED:
+            # closed (& unmarked) tile
+            if self.show_probabilities and not game_ended:
+                percent = self._probability_percent(index)
+                hexagons.append(self.atlas.sprite_blit(HEAT_COLORS[round(percent / 10)], x, y))
+                labels.append(centered_text_blit(render_text(self.font_nerd_16, str(percent), True, 0xffffffff), x, y))
+            else:
+                hexagons.append(self.atlas.sprite_blit(0x404040, x, y))
+
+        elif flag == FlagType.OPEN:
+            # safe & opened tile (the "normal" opened tile in game)
+            nearby_mine_count = self.board.nearby_mines[index]
+            hexagons.append(self.atlas.sprite_blit(HEX_COLOR[nearby_mine_count], x, y))
+            if nearby_mine_count != 0:
+                text = render_text(self.font, str(nearby_mine_count), True, MINE_COLOR[nearby_mine_count])
+                labels.append(centered_text_blit(text, x, y))
             else:
-                raise RuntimeError(f'{i=}, {j=}  |  {state=}')
+                labels.append(centered_text_blit(render_text(self.font_nerd_16, '\ueaab', True, 0x666666ff), x, y))
+
+        else:
+            raise RuntimeError(f'{self.board.coordinate(index)}  |  {self.board[self.board.coordinate(index)]}')
+
+        if self.hint is not None and self.hint[0] == index and not game_ended:
+            # same tile, but recolor the hexagon underneath the labels
+            hexagons[-1] = self.atlas.sprite_blit(HINT_COLOR[self.hint[1]], x, y)
+
+    def draw_all(self, game_ended: bool = False) -> list[pygame.Rect]:
+        """Draw whatever changed since the last call (or everything, after `request_redraw`).
+        Return the areas of the canvas that have to be updated on the display.
+        :game_ended: After finishing the game, show incorrect flags.
+        """
+        full_redraw = self.full_redraw
+        if full_redraw:
+            self.full_redraw = False
+            self.minefield.changed_tiles.clear()
+            self.hud_text = None
+            self.hud_rects = []
+            clear_canvas(self.canvas)
+            self._draw_hud(game_ended)
+            # only what's in the window, which could be a tiny part of a custom board
+            tiles = self.layout.visible(self.board)
+            dirty = []
+        else:
+            dirty = self._draw_hud(game_ended)
+            if not self.minefield.changed_tiles:
+                return dirty
+            tiles = self.minefield.changed_tiles
+            self.minefield.changed_tiles = set()
+
+        layout = self.layout
+        # only re-renders when the radius changed (after a resize or zoom)
+        self.atlas.rebuild(layout.hexagon_radius, TILE_COLORS)
+        stride = self.board.stride
+        i_offset = self.board.i_min - 1
+        j_offset = self.board.j_min - 1
+        x_0 = layout.x_0
+        y_0 = layout.y_0
+        size = layout.size
+        is_visible = layout.is_visible
+        hexagons = []
+        labels = []
+        for index in tiles:
+            # `to_canvas(*board.coordinate(index))`, inlined since this can run for every tile of a big opening
+            row, column = divmod(index, stride)
+            game_i = row + i_offset
+            game_j = column + j_offset
+            x = x_0 + size * (0.8660254037844386*game_j)
+            y = y_0 + size * (game_i + 0.5*game_j)
+            if full_redraw or is_visible(x, y):
+                self._tile_blits(index, x, y, game_ended, hexagons, labels)
+        # labels go on top of the hexagons, so they need to be in a second batch
+        # the sprites cover the whole hexagon, so blitting them also erases the old tiles
+        # (and neither can go over the HUD)
+        self.canvas.set_clip(pygame.Rect(0, HUD_HEIGHT, layout.x_size, layout.y_size - HUD_HEIGHT))
+        hexagon_rects = self.canvas.blits(hexagons, doreturn=not full_redraw)
+        self.canvas.blits(labels, doreturn=False)
+        self.canvas.set_clip(None)
+        if full_redraw:
+            return [self.canvas.get_rect()]
+        return dirty + hexagon_rects
+
+    def request_redraw(self) -> None:
+        """Redraw everything next frame, i.e. after the window was resized or the canvas cleared."""
+        self.full_redraw = True
+
+    def pan(self, x_change: float, y_change: float) -> None:
+        """Move the board by some pixels, but never so far that its middle leaves the window."""
+        layout = self.layout
+        u_max, v_max = self._board_extent()
+        u = min(max(layout.center[0] - x_change/layout.size, 0.0), u_max)
+        v = min(max(layout.center[1] - y_change/layout.size, 0.0), v_max)
+        self.camera_radius = layout.hexagon_radius
+        self.camera_center = u, v
+        self.request_redraw()
+
+    def zoom(self, factor: float, canvas_x: float, canvas_y: float) -> None:
+        """Scale the hexagons by `factor`, keeping the board point under canvas x,y where it is."""
+        layout = self.layout
+        fit = BoardLayout.fit_radius(self.main, self.width, self.height)
+        radius = min(max(layout.hexagon_radius * factor, MIN_RADIUS), max(MAX_RADIUS, fit))
+        if radius == layout.hexagon_radius:
+            return
+        # board point under the cursor, before and after
+        u = (canvas_x - layout.x_0) / layout.size
+        v = (canvas_y - layout.y_0) / layout.size
+        size = 1.7320508075688772*radius + BORDER_BUFFER
+        self.camera_radius = radius
+        self.camera_center = (self.main.x_center - canvas_x) / size + u, (self.main.y_center - canvas_y) / size + v
+        self.pan(0, 0)  # keep it on the board
+
+    def reset_camera(self) -> None:
+        """Go back to fitting the board to the window."""
+        self.camera_radius = None
+        self.camera_center = None
+        self.request_redraw()
+
+    def _nearest_tile(self, canvas_x: float, canvas_y: float) -> tuple[int, int]:
+        """Round canvas x,y to the game i,j of the closest hexagon center."""
+        game_i, game_j = self._to_game(canvas_x, canvas_y)
+        # cube rounding, with the third (implicit) coordinate being -i-j
+        game_k = -game_i - game_j
+        i, j, k = round(game_i), round(game_j), round(game_k)
+        i_diff, j_diff, k_diff = abs(i - game_i), abs(j - game_j), abs(k - game_k)
+        if i_diff > j_diff and i_diff > k_diff:
+            i = -j - k
+        elif j_diff > k_diff:
+            j = -i - k
+        return i, j
+
+    def tile_at(self, canvas_x: float, canvas_y: float) -> tuple[int, int] | None:
+        """Get the game i,j of the tile that canvas x,y is on, or None if it isn't on one."""
+        if canvas_y < HUD_HEIGHT:  # the board isn't drawn there
+            return None
+        # only the closest hexagon can possibly contain the point, so there's no need to check every tile
+        i1, j1 = self._nearest_tile(canvas_x, canvas_y)
+        if (i1, j1) not in self.board:
+            return None
+        # check radius (of apothem)
+        layout = self.layout
+        x1, y1 = layout.to_canvas(i1, j1)
+        distance = math.sqrt((x1 - canvas_x) ** 2 + (y1 - canvas_y) ** 2)
+        # Circle with radius of apothem. This restricts clicking on the edges/corners slightly but is more precise.
+        if distance < 0.8660254037844386*layout.hexagon_radius - 2:
+            return i1, j1
+        return None
 
     def handle_click(self, event: pygame.event.Event) -> bool:
         """Handle a `MOUSEBUTTONDOWN` event. Return whether you're still alive."""
-        # check radius (of apothem)
-        for i1, j1 in self.board:
-            x1, y1 = self._to_canvas(i1, j1)
-            distance = math.sqrt((x1 - event.pos[0]) ** 2 + (y1 - event.pos[1]) ** 2)
-            # Circle with radius of apothem. This restricts clicking on the edges/corners slightly but is more precise.
-            if distance < 0.8660254037844386*self.hexagon_radius - 2:
-                if event.button == 1:
-                    return self.open_tile(i1, j1)
-                if event.button == 3:
-                    self.flag_tile(i1, j1)
-                    return True
+        tile = self.tile_at(*event.pos)
+        if tile is not None:
+            if event.button == 1:
+                return self.open_tile(*tile)
+            if event.button == 3:
+                self.flag_tile(*tile)
         return True
 
     def open_tile(self, i: int, j: int, clicked_by_user: bool = True) -> bool:
         """Handle when a player left-clicks a tile. Return whether you're still alive."""
-        current_tile = self.board[(i, j)]
-        if current_tile.flagged and clicked_by_user:
-            # you can't open flags (but if they were auto-opened, they will still open)
-            return True
-        if current_tile.mined:
-            self.board[(i, j)].flag = FlagType.POST_GAME_LOSS_CAUSE
+        first_click = not self.minefield.mines_set
+        if first_click and self.board[i, j].unmarked:
+            self._place_mines(i, j)
+        alive = self.minefield.open_tile(i, j, clicked_by_user)
+        if first_click and self.minefield.mines_set:
+            self.tick_start = self.main.number_tick
+            self.recording.set_board(self.minefield)
+        self.recording.add(self._ticks_passed(), Action.OPEN, i, j)
+        self._after_action()
+        return alive
+
+    def _place_mines(self, i: int, j: int) -> None:
+        """Place the mines for the first click, from a ready layout if there's one that works for it."""
+        if self.pool is not None:
+            ready = self.pool.take(self.width, self.height, self.mine_count, self.no_guess, self.board.index(i, j))
+            if ready is not None:
+                self.minefield.reproduce(*ready)
+                return
+        seed = None
+        if self.no_guess:
+            # nothing ready, so this has to wait for it (for up to `generation.MAX_SECONDS`)
+            seed, _ = generation.no_guess_layout(self.width, self.height, self.mine_count, (i, j))
+        # (a normal board, or if no-guess gave up, gets a new seed)
+        self.minefield.set_mines((i, j), seed)
+
+    def flag_tile(self, i: int, j: int, question: bool = None):
+        if question is None:
+            question = pygame.key.get_pressed()[pygame.K_LSHIFT]
+        self.minefield.flag_tile(i, j, question=question)
+        self.recording.add(self._ticks_passed(), Action.QUESTION if question else Action.FLAG, i, j)
+        self._after_action()
+
+    def _ticks_passed(self) -> int:
+        """Get the ticks since the timer started (0 before the first click)."""
+        if self.tick_start is None:
+            return 0
+        return self.main.number_tick - self.tick_start
+
+    def undo(self) -> bool:
+        """Take back the last action, which makes this a practice game. Return whether there was one."""
+        if not self.minefield.undo():
             return False
+        self.practice = True
+        self._after_history()
+        return True
+
+    def redo(self) -> bool:
+        """Do the last undone action again. Return whether you're still alive."""
+        alive = self.minefield.redo()
+        if alive is not None:
+            self._after_history()
+        return alive is not False
 
-        if current_tile.closed:  # closed & safe
-            self.board[(i, j)].flag = FlagType.OPEN
-            if not self.mines_set:  # first click
-                self.set_mines(remove_this=(i, j))
-                self.mines_set = True
-                self.tick_start = self.main.number_tick
-            if self._get_nearby_mines(i, j) == 0:
-                # if there are no nearby mines, automatically open more
-                for i_off, j_off in NEARBY_TILES:
-                    i1 = i + i_off
-                    j1 = j + j_off
-                    if (i1, j1) in self.board:
-                        result = self.open_tile(i1, j1, False)
-                        if not result:
-                            return False
+    #
+
+    def _after_history(self) -> None:
+        """Start the solver and heat map over after undo or redo (they only follow a board forwards)."""
+        self.solver = None
+        self.probabilities = None
+        if self.show_probabilities:
+            self._update_probabilities()
+        self._set_hint(None)
+
+    def _after_action(self) -> None:
+        """Keep the solver and heat map up to date and take down the hint after the board changed."""
+        if self.solver is not None:
+            self.solver.notify(self.minefield.changed_tiles)
+        if self.probabilities is not None:
+            self.probabilities.notify(self.minefield.changed_tiles)
+        if self.show_probabilities:
+            self._update_probabilities()
+        self._set_hint(None)
+
+    def _set_hint(self, hint: tuple[int, bool] | None) -> None:
+        if self.hint is not None:
+            self.minefield.changed_tiles.add(self.hint[0])
+        self.hint = hint
+        if hint is not None:
+            self.minefield.changed_tiles.add(hint[0])
+
+    def next_move(self) -> tuple[int, bool] | None:
+        """Get a tile that can be figured out from the numbers, as (index, is it a mine), or None to guess."""
+        if not self.minefield.mines_set:
+            # the first click is always safe, so start in the middle
+            indices = self.board.indices
+            return indices[len(indices) // 2], False
+        return self._get_solver().next_move()
+
+    def _get_solver(self) -> Solver:
+        if self.solver is None:
+            self.solver = Solver(self.minefield)
+        return self.solver
+
+    def show_hint(self) -> None:
+        """Highlight the next move (green to open, purple to flag), which makes this a practice game."""
+        self.practice = True
+        self._set_hint(self.next_move())
+
+    def toggle_probabilities(self) -> None:
+        """Show or hide the chance that each closed tile is a mine."""
+        self.show_probabilities = not self.show_probabilities
+        if self.show_probabilities:
+            self._update_probabilities()
+        self.request_redraw()
+
+    def _probability_percent(self, index: int) -> int:
+        return round(100 * self.mine_probabilities.get(index, self.interior_probability))
+
+    def _update_probabilities(self) -> None:
+        """Recompute the heat map, and redraw the tiles whose numbers changed.
+        Only the tiles next to the numbers (now or last time) are compared, everything else shares one number.
+        """
+        if self.probabilities is None:
+            from probability import ProbabilityEngine  # only imported once the heat map is turned on
+            self.probabilities = ProbabilityEngine(self.minefield, self._get_solver())
+        old_probabilities, old_interior = self.mine_probabilities, self.interior_probability
+        self.mine_probabilities, self.interior_probability = self.probabilities.compute()
+        if round(100 * old_interior) != round(100 * self.interior_probability):
+            # every closed tile away from the numbers changed, and only the ones in the window have to be drawn
+            self.request_redraw()
+            return
+        self.minefield.changed_tiles.update(
+            index for index in old_probabilities.keys() | self.mine_probabilities.keys()
+            if round(100 * old_probabilities.get(index, old_interior)) != self._probability_percent(index))
+
+    def play_move(self, index: int, is_mine: bool) -> bool:
+        """Make a move from `next_move`, which makes this a practice game. Return whether you're still alive."""
+        self.practice = True
+        i, j = self.board.coordinate(index)
+        flag = self.board.flags[index]
+        if is_mine:
+            # question flags are cleared first, then flagged on the next move
+            self.flag_tile(i, j, question=False)
             return True
-        if current_tile.open_safe and clicked_by_user:  # chord (open nearby)
-            if self._get_nearby_mines(i, j) == self._get_nearby_flagged(i, j) and self._no_nearby_question(i, j):
-                for i_off, j_off in NEARBY_TILES:
-                    i1 = i + i_off
-                    j1 = j + j_off
-                    if (i1, j1) in self.board:
-                        if not self.board[(i1, j1)].flagged:
-                            result = self.open_tile(i1, j1, False)
-                            if not result:
-                                return False
+        if flag in {FlagType.FLAGGED, FlagType.QUESTION}:
+            self.flag_tile(i, j)  # the player flagged a safe tile, so clear it first
             return True
-        return True
-
-    def flag_tile(self, i: int, j: int):
-        current_type = self.board[(i, j)]
-        if current_type.flagged:
-            self.board[(i, j)].flag = FlagType.NONE_CLOSED
-        elif current_type.unmarked:
-            if pygame.key.get_pressed()[pygame.K_LSHIFT]:
-                self.board[(i, j)].flag = FlagType.QUESTION
-            else:
-                self.board[(i, j)].flag = FlagType.FLAGGED
-        else:
-            assert current_type.open_safe
+        return self.open_tile(i, j)
@@ -0,0 +1,417 @@
+"""Game rules. This has no rendering (and doesn't import pygame), so it can also run headless."""
+
+from __future__ import annotations
+
+import random
+from array import array
+from dataclasses import dataclass, field
+
+from board import FlagType, HexBoard, TileType
+from history import History
+from metrics import BoardMetrics, measure
+
+
+# maps `HexBoard.valid` to the tiles of a board with no mines yet
+_VALID_TO_SAFE = bytes.maketrans(b'\x00\x01', bytes([TileType.NOT_YET_GENERATED, TileType.SAFE]))
+
+# width, height, mines
+DIFFICULTIES = {
+    'easy': (11, 8, 14),
+    'medium': (21, 13, 48),
+    'hard': (31, 17, 110),
+}
+MAX_SIZE = 1000  # for custom boards, in both directions
+
+
+def check_size(width: int, height: int, mine_count: int) -> None:
+    """Raise a ValueError (with a message that can be shown to the player) if a board can't have this size and mine
+    count. The width has to be odd, and the height has to fit the slanted top and bottom.
+    """
+    if width % 2 == 0 or not 3 <= width <= MAX_SIZE:
+        raise ValueError(f'The width has to be odd, from 3 to {MAX_SIZE}.')
+    if not (width+1)//2 <= height <= MAX_SIZE:
+        raise ValueError(f'The height has to be from {(width+1)//2} to {MAX_SIZE} for this width.')
+    # the first click and the tiles around it never have mines
+    area = width*height - (width-1)//2
+    if not 1 <= mine_count <= area - 7:
+        raise ValueError(f'There has to be from 1 to {area - 7} mines.')
+
+
+def difficulty_name(width: int, height: int, mine_count: int) -> str:
+    """Get the name of the difficulty with this size and mine count in `DIFFICULTIES`, or 'custom'."""
+    for name, size in DIFFICULTIES.items():
+        if size == (width, height, mine_count):
+            return name
+    return 'custom'
+
+
+# `HexBoard.symmetries` looks at every tile, which costs more than placing the mines, and every board of the same size
+# has the same ones, see `Minefield.symmetries`
+_symmetries: dict[tuple[int, int], list[array]] = {}
+
+# check the running flag counters against a full recount whenever they're read (slow, for debugging only)
+DEBUG_COUNTERS = False
+
+
+@dataclass
+class Minefield:
+    width: int
+    height: int
+    mine_count: int
+
+    board: HexBoard = field(init=False, default=None)
+    mines_set: bool = field(init=False, default=False)
+    # where the mines came from: `layout(origin, seed)`, moved by `board.symmetries()[symmetry]`
+    # this is all it takes to make the exact same board again, see `reproduce`
+    seed: int = field(init=False, default=None)
+    origin: int = field(init=False, default=None)  # by board index
+    symmetry: int = field(init=False, default=0)
+    # 3BV and the openings, for every board the game plays (not the ones only tried by no-guess generation)
+    metrics: BoardMetrics = field(init=False, default=None)
+    # running counts, so they don't have to be recounted over the whole board every frame
+    opened_count: int = field(init=False, default=0)
+    flag_count: int = field(init=False, default=0)
+    question_count: int = field(init=False, default=0)
+    incorrect_flag_count: int = field(init=False, default=0)
+    # every tile whose flag changed, for renderers (which should clear it after drawing)
+    changed_tiles: set[int] = field(init=False, default_factory=set)  # by board index
+    # undo and redo, if they're turned on with `keep_history` (the solver and generation don't need them)
+    history: History = field(init=False, default=None)
+
+    def get_nearby_mines(self, i: int, j: int) -> int:
+        """Get the nearby mines."""
+        return self.board.nearby_mines[self.board.index(i, j)]
+
+    def get_nearby_flagged(self, i: int, j: int) -> int:
+        """Get the nearby flagged tiles."""
+        return self.board.nearby_flagged[self.board.index(i, j)]
+
+    def no_nearby_question(self, i: int, j: int) -> bool:
+        """Get whether there are no nearby question flags."""
+        return self.board.nearby_questions[self.board.index(i, j)] == 0
+
+    def estimated_mines_remaining(self) -> tuple[int, int, int]:
+        """Get the estimated (flags) count of mines left.
+        Return a tuple of
+            0. the mine count with only full flags
+            1. the mine count also including question flags
+            2. the number of incorrect full flags (NOT including questions)
+        """
+        if DEBUG_COUNTERS:
+            self._check_counters()
+        strict_flags = self.flag_count
+        questions = self.flag_count + self.question_count
+        return self.mine_count - strict_flags, self.mine_count - questions, self.incorrect_flag_count
+
+    def _count_flags(self) -> tuple[int, int, int, int]:
+        """Count the opened tiles, full flags, question flags, and incorrect full flags, from scratch."""
+        opened = 0
+        strict_flags = 0
+        questions = 0
+        incorrect_strict_flags = 0
+        tiles = self.board.tiles
+        flags = self.board.flags
+        for index in self.board.indices:
+            if flags[index] == FlagType.OPEN:
+                opened += 1
+            elif flags[index] == FlagType.FLAGGED:
+                strict_flags += 1
+                if tiles[index] != TileType.MINE:
+                    incorrect_strict_flags += 1
+            elif flags[index] == FlagType.QUESTION:
+                questions += 1
+        return opened, strict_flags, questions, incorrect_strict_flags
+
+    def _check_counters(self) -> None:
+        counters = (self.opened_count, self.flag_count, self.question_count, self.incorrect_flag_count)
+        recount = self._count_flags()
+        if counters != recount:
+            raise RuntimeError(f'counters out of sync: {counters=} {recount=}')
+
+    #
+    #
+    #
+
+    def init(self) -> None:
+        """Initialize the board, in-place."""
+        MAIN_WIDTH = self.width - 1
+        MAIN_HEIGHT = self.height - MAIN_WIDTH//2 - 1
+        assert MAIN_WIDTH % 2 == 0
+        self.board = HexBoard(-MAIN_WIDTH//2, MAIN_HEIGHT + MAIN_WIDTH//2, 0, MAIN_WIDTH)
+        # top section
+        for i in range(-MAIN_WIDTH//2, 0):
+            j_min = -2 * i
+            j_max = MAIN_WIDTH
+            self.board.add_row(i, j_min, j_max)
+        # normal section
+        for i in range(0, MAIN_HEIGHT+1):
+            self.board.add_row(i, 0, MAIN_WIDTH)
+        # bottom section
+        for i in range(MAIN_HEIGHT+1, MAIN_HEIGHT + MAIN_WIDTH//2 + 1):
+            j_min = 0
+            n = i - MAIN_HEIGHT
+            j_max = MAIN_WIDTH - 2*n
+            self.board.add_row(i, j_min, j_max)
+
+    def keep_history(self) -> None:
+        """Start keeping every action from here on, for `undo` and `redo`."""
+        self.history = History.for_flags(self.board.flags)
+
+    def set_mines(self, remove_this: tuple[int, int], seed: int = None) -> None:
+        """Set the mines in the board.
+        :remove: denotes what to NOT put a mine on, which is the first tile that was opened
+        :seed: makes the same layout every time (a new seed is picked if it isn't given)
+        """
+        if seed is None:
+            seed = random.getrandbits(32)
+        origin = self.board.index(*remove_this)
+        self.place_mines(self.layout(origin, seed), seed=seed, origin=origin)
+        self.metrics = measure(self.board)
+
+    def layout(self, origin: int, seed: int) -> list[int]:
+        """Pick the mines for a seed, never on or around the first tile (by index)."""
+        board = self.board
+        removed = {origin, *board.neighbors(origin)}
+        # sampling a few extra and dropping the removed tiles is the same as sampling only from the allowed tiles,
+        # but it never has to build a list of them (which is as big as the board)
+        sample = random.Random(seed).sample(board.indices, self.mine_count + len(removed))
+        return [index for index in sample if index not in removed][:self.mine_count]
+
+    def reproduce(self, seed: int, origin: int, symmetry: int = 0) -> None:
+        """Place the exact mines of an earlier game, from its `seed`, `origin` and `symmetry`."""
+        mines = self.layout(origin, seed)
+        if symmetry != 0:
+            mapping = self.symmetries()[symmetry]
+            mines = [mapping[index] for index in mines]
+        self.place_mines(mines, seed=seed, origin=origin, symmetry=symmetry)
+        self.metrics = measure(self.board)
+
+    def symmetries(self) -> list[array]:
+        """Get `board.symmetries()`, only worked out once for every board size."""
+        key = self.width, self.height
+        if key not in _symmetries:
+            _symmetries[key] = self.board.symmetries()
+        return _symmetries[key]
+
+    def place_mines(self, mines: list[int], seed: int = None, origin: int = None, symmetry: int = 0) -> None:
+        """Put mines on exactly these tiles (by index), and make everything else safe.
+        :seed, origin, symmetry: where the layout came from, so it can be reproduced
+        """
+        self.seed = seed
+        self.origin = origin
+        self.symmetry = symmetry
+        self.metrics = None
+        board = self.board
+        # every valid tile is safe (and `valid` is all 0s and 1s, so that's one translate)
+        board.tiles[:] = board.valid.translate(_VALID_TO_SAFE)
+        mined = bytearray(len(board.valid))
+        for index in mines:
+            assert board.flags[index] != FlagType.OPEN
+            board.tiles[index] = TileType.MINE
+            mined[index] = 1
+        # every mine adds one to each of its neighbors, i.e. the counts are the sum of `mined` shifted by each
+        # neighbor offset. Adding the bytes as one big integer does that all at once, and no tile has more than 6
+        # mines around it, so nothing ever carries into the next byte.
+        # (the border around the board can be counted too, it's unused, and keeps the shifts inside the array)
+        mined_int = int.from_bytes(mined, 'little')
+        total = 0
+        for offset in board.neighbor_offsets:
+            total += mined_int << (8*offset) if offset > 0 else mined_int >> (-8*offset)
+        board.nearby_mines[:] = total.to_bytes(len(board.valid), 'little')
+        # flags placed before the first click were all incorrect, but now some of them could be on mines
+        if self.flag_count != 0:
+            self.incorrect_flag_count = self._count_flags()[3]
+        self.mines_set = True
+
+    #
+    #
+    #
+
+    def show_all_mines_winning(self) -> None:
+        """Shows all mines for a win. All mined locations are flagged."""
+        board = self.board
+        for index in board.indices:
+            if board.tiles[index] == TileType.MINE:
+                assert board.flags[index] != FlagType.OPEN
+                self._set_flag(index, FlagType.FLAGGED)
+
+    def show_all_mines_losing(self) -> None:
+        """Shows all mines for a loss."""
+        board = self.board
+        for index in board.indices:
+            if board.tiles[index] == TileType.MINE:
+                if board.flags[index] == FlagType.QUESTION:
+                    self._set_flag(index, FlagType.FLAGGED)
+                elif board.flags[index] not in {FlagType.FLAGGED, FlagType.POST_GAME_LOSS_CAUSE}:
+                    # POST_GAME_LOSS_CAUSE was set already, and correctly flagged mines keep their flags
+                    self._set_flag(index, FlagType.POST_GAME_LOSS)
+
+    def check_victory(self) -> bool:
+        """Check if you win or not."""
+        if DEBUG_COUNTERS:
+            self._check_counters()
+        area = self.width*self.height - (self.width-1)//2
+        return self.opened_count == area - self.mine_count
+
+    #
+    #
+    #
+
+    def _set_flag(self, index: int, flag: FlagType) -> None:
+        """Change the flag of a tile, update the counters, and mark it as changed."""
+        board = self.board
+        old_flag = board.flags[index]
+        board.flags[index] = flag
+        self.changed_tiles.add(index)
+        if self.history is not None and self.history.current is not None:
+            self.history.current.add(index, old_flag, flag)
+        self.opened_count += (flag == FlagType.OPEN) - (old_flag == FlagType.OPEN)
+        flag_change = (flag == FlagType.FLAGGED) - (old_flag == FlagType.FLAGGED)
+        if flag_change != 0:
+            self.flag_count += flag_change
+            if board.tiles[index] != TileType.MINE:
+                self.incorrect_flag_count += flag_change
+            # the border around the board can be counted too, it's unused
+            for offset in board.neighbor_offsets:
+                board.nearby_flagged[index + offset] += flag_change
+        question_change = (flag == FlagType.QUESTION) - (old_flag == FlagType.QUESTION)
+        if question_change != 0:
+            self.question_count += question_change
+            for offset in board.neighbor_offsets:
+                board.nearby_questions[index + offset] += question_change
+
+    def open_tile(self, i: int, j: int, clicked_by_user: bool = True) -> bool:
+        """Handle when a player left-clicks a tile. Return whether you're still alive."""
+        if self.history is None:
+            return self._open_index(self.board.index(i, j), clicked_by_user)
+        step = self.history.begin()
+        step.alive = self._open_index(self.board.index(i, j), clicked_by_user)
+        return step.alive
+
+    def _open_index(self, index: int, clicked_by_user: bool) -> bool:
+        board = self.board
+        flag = board.flags[index]
+        if flag in {FlagType.FLAGGED, FlagType.QUESTION} and clicked_by_user:
+            # you can't open flags (but if they were auto-opened, they will still open)
+            return True
+        if board.tiles[index] == TileType.MINE:
+            self._set_flag(index, FlagType.POST_GAME_LOSS_CAUSE)
+            return False
+
+        if flag != FlagType.OPEN:  # closed & safe
+            if not self.mines_set:  # first click
+                self.set_mines(remove_this=board.coordinate(index))
+            self._flood_open(index)
+            return True
+        if clicked_by_user:  # chord (open nearby)
+            if board.nearby_mines[index] == board.nearby_flagged[index] and board.nearby_questions[index] == 0:
+                for neighbor in board.neighbors(index):
+                    if board.flags[neighbor] not in {FlagType.FLAGGED, FlagType.QUESTION, FlagType.OPEN}:
+                        if board.tiles[neighbor] == TileType.MINE:
+                            self._set_flag(neighbor, FlagType.POST_GAME_LOSS_CAUSE)
+                            return False
+                        self._flood_open(neighbor)
+            return True
+        return True
+
+    def _flood_open(self, start: int) -> list[int]:
+        """Open a closed, safe tile. If there are no nearby mines, also open everything around it, and so on.
+        Return all the tiles that were opened.
+        """
+        board = self.board
+        flags = board.flags
+        nearby_mines = board.nearby_mines
+        valid = board.valid
+        neighbor_offsets = board.neighbor_offsets
+        # plain ints are much faster to compare than enum members, and this loop can run millions of times
+        OPEN = int(FlagType.OPEN)
+        NONE_CLOSED = int(FlagType.NONE_CLOSED)
+        opened = [start]
+        unmarked_opened = 0
+        # tiles are opened as soon as they're found, so the flags also mark which tiles were already visited
+        if flags[start] == FlagType.NONE_CLOSED:
+            flags[start] = FlagType.OPEN
+            unmarked_opened += 1
+        else:
+            self._set_flag(start, FlagType.OPEN)
+        to_visit = [start]
+        while to_visit:
+            index = to_visit.pop()
+            if nearby_mines[index] != 0:
+                continue
+            # if there are no nearby mines, automatically open more
+            for offset in neighbor_offsets:
+                neighbor = index + offset
+                if valid[neighbor] and flags[neighbor] != OPEN:
+                    if flags[neighbor] == NONE_CLOSED:
+                        flags[neighbor] = OPEN
+                        unmarked_opened += 1
+                    else:
+                        # auto-opened flags need to update the flag counts
+                        self._set_flag(neighbor, FlagType.OPEN)
+                    opened.append(neighbor)
+                    to_visit.append(neighbor)
+        # update the counters and changed tiles for the unmarked tiles all at once (`_set_flag` did the others)
+        self.opened_count += unmarked_opened
+        self.changed_tiles.update(opened)
+        if self.history is not None and self.history.current is not None:
+            # only the unmarked ones, `_set_flag` kept the others
+            step = self.history.current
+            if unmarked_opened == len(opened):
+                step.opened.extend(opened)
+            else:
+                marked = set(step.indices)
+                step.opened.extend(index for index in opened if index not in marked)
+        return opened
+
+    def flag_tile(self, i: int, j: int, question: bool = False) -> None:
+        """Handle when a player right-clicks a tile. Flagged tiles are unflagged.
+        :question: Place a question flag instead of a full flag.
+        """
+        if self.history is not None:
+            self.history.begin()
+        index = self.board.index(i, j)
+        current_flag = self.board.flags[index]
+        if current_flag in {FlagType.FLAGGED, FlagType.QUESTION}:
+            self._set_flag(index, FlagType.NONE_CLOSED)
+        elif current_flag == FlagType.NONE_CLOSED:
+            if question:
+                self._set_flag(index, FlagType.QUESTION)
+            else:
+                self._set_flag(index, FlagType.FLAGGED)
+        else:
+            assert current_flag == FlagType.OPEN
+
+    #
+    #
+    #
+
+    def undo(self) -> bool:
+        """Take back the last action (after `keep_history`). Return whether there was one."""
+        step = self.history.take_undo(self.board.flags)
+        if step is None:
+            return False
+        self._set_opened(step.opened, False)
+        # backwards, so a tile that changed twice ends up with its first old flag
+        for index, flag in zip(reversed(step.indices), reversed(step.old)):
+            self._set_flag(index, FlagType(flag))
+        return True
+
+    def redo(self) -> bool | None:
+        """Do the last undone action again. Return whether you're still alive after it, or None if there wasn't one."""
+        step = self.history.take_redo()
+        if step is None:
+            return None
+        for index, flag in zip(step.indices, step.new):
+            self._set_flag(index, FlagType(flag))
+        self._set_opened(step.opened, True)
+        return step.alive
+
+    def _set_opened(self, indices: array, opened: bool) -> None:
+        """Open or close tiles with no flag all at once, like the end of `_flood_open`."""
+        flags = self.board.flags
+        flag = FlagType.OPEN if opened else FlagType.NONE_CLOSED
+        for index in indices:
+            flags[index] = flag
+        self.opened_count += len(indices) if opened else -len(indices)
+        self.changed_tiles.update(indices)
@@ -0,0 +1,19 @@
+"""Every font the game uses, loaded from disk the first time it's needed and then shared.
+Sharing the same Font objects also means the text cache (`utils.render_text`, keyed by font) keeps working across games.
+"""
+
+from __future__ import annotations
+
+import functools
+
+import pygame
+
+
+SERIF = 'assets/liberationserif.ttf'
+NERD = 'assets/jetbrainsmononerd.ttf'  # monospace, with the icons
+
+
+@functools.lru_cache(maxsize=None)
+def get_font(path: str, size: int) -> pygame.font.Font:
+    """Get a font, loading it if this is the first time."""
+    return pygame.font.Font(path, size)
@@ -4,14 +4,19 @@ from __future__ import annotations
 
 import enum
 import math
-from dataclasses import dataclass, field
+import time
+from dataclasses import dataclass, field, replace
 from typing import TYPE_CHECKING
 
 import pygame
 from pygame import draw
 
 from core import CoreGame
-from utils import clear_canvas, draw_centered_text, draw_hexagon
+from engine import DIFFICULTIES, check_size
+from fonts import NERD, SERIF, get_font
+from leaderboard import ORDERS, PAGE_SIZE, Entry, GameResult, Leaderboard, board_category
+from pregen import PregenPool
+from utils import HexagonAtlas, clear_canvas, draw_centered_text, draw_hexagon, draw_right_align_text, render_text
 
 if TYPE_CHECKING:
     from main import Main
@@ -22,12 +27,20 @@ TITLE_H = 35
 RESULT_W = 85
 RESULT_H = 20
 RESULT_X_OFFSET = 180
+CUSTOM_FIELDS = ['Width', 'Height', 'Mines']
+FIELD_W = 110
+PAN_STEP = 100  # pixels, for the arrow keys
+ARROW_PANS = {pygame.K_LEFT: (PAN_STEP, 0), pygame.K_RIGHT: (-PAN_STEP, 0),
+              pygame.K_UP: (0, PAN_STEP), pygame.K_DOWN: (0, -PAN_STEP)}
+ZOOM_STEP = 1.15
 
 
 class Playing(enum.Enum):
     MENU = 0
     CORE_GAME = 1
     ENDING = 2
+    CUSTOM_MENU = 3
+    LEADERBOARD = 4
 
 
 @dataclass
@@ -39,31 +52,74 @@ class Game:
     playing: Playing = field(init=False, default=Playing.MENU)
     last_game_mode: str = field(init=False, default=None)
     endpoint: int = field(init=False, default=0)
+    full_redraw: bool = field(init=False, default=True)
+    auto_play: bool = field(init=False, default=False)
+    no_guess: bool = field(init=False, default=False)
+    pool: PregenPool = field(init=False, default_factory=PregenPool)
+    atlas: HexagonAtlas = field(init=False, default=None)  # for every game
+    custom_size: tuple[int, int, int] = field(init=False, default=(61, 33, 440))  # last custom board
+    custom_text: list[str] = field(init=False, default_factory=list)  # what's typed into each field
+    custom_field: int = field(init=False, default=0)  # the one being typed into
+    custom_error: str = field(init=False, default='')
+    leaderboard: Leaderboard = field(init=False, default_factory=Leaderboard)
+    leaderboard_category: str = field(init=False, default=None)  # the one being shown
+    leaderboard_order: str = field(init=False, default='time')  # what it's ranked by, see `ORDERS`
+    leaderboard_pages: list[tuple[float, float, int] | None] = field(init=False, default_factory=list)  # start keys
+    leaderboard_entries: list[Entry] = field(init=False, default_factory=list)  # on the page being shown
+    leaderboard_more: bool = field(init=False, default=False)  # whether there's a next page
+
+    # fonts are shared (see `fonts`), and only loaded when something is drawn with them
 
-    font_30: pygame.font.Font = field(init=False)
-    font_42: pygame.font.Font = field(init=False)
-    font_50: pygame.font.Font = field(init=False)
-    font_60: pygame.font.Font = field(init=False)
+    @property
+    def font_30(self) -> pygame.font.Font:
+        return get_font(SERIF, 30)
+
+    @property
+    def font_42(self) -> pygame.font.Font:
+        return get_font(SERIF, 42)
 
-    def __post_init__(self):
-        self.font_30 = pygame.font.Font('assets/liberationserif.ttf', 30)
-        self.font_42 = pygame.font.Font('assets/liberationserif.ttf', 42)
-        self.font_50 = pygame.font.Font('assets/liberationserif.ttf', 50)
-        self.font_60 = pygame.font.Font('assets/liberationserif.ttf', 60)
+    @property
+    def font_50(self) -> pygame.font.Font:
+        return get_font(SERIF, 50)
+
+    @property
+    def font_60(self) -> pygame.font.Font:
+        return get_font(SERIF, 60)
+
+    @property
+    def font_nerd_20(self) -> pygame.font.Font:
+        return get_font(NERD, 20)
 
     # Bounding boxes for the buttons. These need to be dynamically calculated due to the window size.
 
     @property
     def easy_rect(self) -> pygame.Rect:
-        return pygame.Rect(self.main.x_center-TITLE_W, 250-TITLE_H, 2*TITLE_W, 2*TITLE_H)
+        return pygame.Rect(self.main.x_center-TITLE_W, 200-TITLE_H, 2*TITLE_W, 2*TITLE_H)
 
     @property
     def medium_rect(self) -> pygame.Rect:
-        return pygame.Rect(self.main.x_center-TITLE_W, 375-TITLE_H, 2*TITLE_W, 2*TITLE_H)
+        return pygame.Rect(self.main.x_center-TITLE_W, 295-TITLE_H, 2*TITLE_W, 2*TITLE_H)
 
     @property
     def hard_rect(self) -> pygame.Rect:
-        return pygame.Rect(self.main.x_center-TITLE_W, 500-TITLE_H, 2*TITLE_W, 2*TITLE_H)
+        return pygame.Rect(self.main.x_center-TITLE_W, 390-TITLE_H, 2*TITLE_W, 2*TITLE_H)
+
+    @property
+    def custom_rect(self) -> pygame.Rect:
+        return pygame.Rect(self.main.x_center-TITLE_W, 485-TITLE_H, 2*TITLE_W, 2*TITLE_H)
+
+    @property
+    def no_guess_rect(self) -> pygame.Rect:
+        return pygame.Rect(self.main.x_center-TITLE_W, 570-RESULT_H, 2*TITLE_W, 2*RESULT_H)
+
+    def field_rect(self, number: int) -> pygame.Rect:
+        """The box of one of the `CUSTOM_FIELDS`."""
+        return pygame.Rect(self.main.x_center+20, 200+75*number-TITLE_H, 2*FIELD_W, 2*TITLE_H)
+
+    @property
+    def start_rect(self) -> pygame.Rect:
+        return pygame.Rect(self.main.x_center+RESULT_X_OFFSET-RESULT_W, self.main.y_size-25-RESULT_H,
+                           2*RESULT_W, 2*RESULT_H)
 
     @property
     def again_rect(self) -> pygame.Rect:
@@ -85,82 +141,322 @@ class Game:
 
     def run_menu(self) -> None:
         self.playing = Playing.MENU
+        # get boards ready for whichever button gets clicked
+        for width, height, mine_count in DIFFICULTIES.values():
+            self.pool.want(width, height, mine_count, self.no_guess)
         clear_canvas(self.canvas)
         # title
-        draw_centered_text(self.canvas, self.font_60.render('HEXAMINE', True, 0xff55ffff),
+        draw_centered_text(self.canvas, render_text(self.font_60, 'HEXAMINE', True, 0xff55ffff),
                            self.main.x_center, 90)
         draw_hexagon(self.canvas, self.main.x_center-230, 90, 37.5, 0xff55ff)
         draw_hexagon(self.canvas, self.main.x_center+230, 90, 37.5, 0xff55ff)
         # difficulty buttons
         draw.rect(self.canvas, 0x00aa00, self.easy_rect)
-        draw_centered_text(self.canvas, self.font_42.render('Easy Difficulty', True, 0xffffffff),
-                           self.main.x_center, 250)
+        draw_centered_text(self.canvas, render_text(self.font_42, 'Easy Difficulty', True, 0xffffffff),
+                           self.main.x_center, 200)
         draw.rect(self.canvas, 0xffaa00, self.medium_rect)
-        draw_centered_text(self.canvas, self.font_42.render('Medium Difficulty', True, 0xffffffff),
-                           self.main.x_center, 375)
+        draw_centered_text(self.canvas, render_text(self.font_42, 'Medium Difficulty', True, 0xffffffff),
+                           self.main.x_center, 295)
         draw.rect(self.canvas, 0xaa0000, self.hard_rect)
-        draw_centered_text(self.canvas, self.font_42.render('Hard Difficulty', True, 0xffffffff),
-                           self.main.x_center, 500)
+        draw_centered_text(self.canvas, render_text(self.font_42, 'Hard Difficulty', True, 0xffffffff),
+                           self.main.x_center, 390)
+        draw.rect(self.canvas, 0x5555aa, self.custom_rect)
+        draw_centered_text(self.canvas, render_text(self.font_42, 'Custom Board', True, 0xffffffff),
+                           self.main.x_center, 485)
+        # options
+        draw.rect(self.canvas, 0x5555aa if self.no_guess else 0x404040, self.no_guess_rect)
+        text = f'No-guess boards: {"ON" if self.no_guess else "OFF"}'
+        draw_centered_text(self.canvas, render_text(self.font_30, text, True, 0xffffffff), self.main.x_center, 570)
+
+    def run_custom_menu(self) -> None:
+        clear_canvas(self.canvas)
+        draw_centered_text(self.canvas, render_text(self.font_60, 'Custom Board', True, 0xff55ffff),
+                           self.main.x_center, 90)
+        for number, name in enumerate(CUSTOM_FIELDS):
+            rect = self.field_rect(number)
+            draw_right_align_text(self.canvas, render_text(self.font_42, name, True, 0xffffffff),
+                                  self.main.x_center-20, rect.centery-25)
+            draw.rect(self.canvas, 0x5555aa if number == self.custom_field else 0x404040, rect)
+            text = self.custom_text[number] + ('_' if number == self.custom_field else '')
+            draw_centered_text(self.canvas, render_text(self.font_42, text, True, 0xffffffff),
+                               rect.centerx, rect.centery)
+        # what's wrong with it, or how to fill it in
+        message = self.custom_error or 'Type a number, Tab for the next one, Enter to play'
+        draw_centered_text(self.canvas, render_text(self.font_30, message, True,
+                                                    0xff5555ff if self.custom_error else 0xaaaaaaff),
+                           self.main.x_center, 440)
+        draw.rect(self.canvas, 0x00aa00, self.menu_rect)
+        draw_centered_text(self.canvas, render_text(self.font_30, 'Main Menu', True, 0xffffffff),
+                           self.main.x_center-RESULT_X_OFFSET, self.main.y_size-25)
+        draw.rect(self.canvas, 0x00aa00, self.start_rect)
+        draw_centered_text(self.canvas, render_text(self.font_30, 'Start', True, 0xffffffff),
+                           self.main.x_center+RESULT_X_OFFSET, self.main.y_size-25)
 
     def run_result_menu(self) -> None:
         draw.rect(self.canvas, 0x00aa00, self.again_rect)
-        draw_centered_text(self.canvas, self.font_30.render('Play Again', True, 0xffffffff),
+        draw_centered_text(self.canvas, render_text(self.font_30, 'Play Again', True, 0xffffffff),
                            self.main.x_center, self.main.y_size-25)
         draw.rect(self.canvas, 0x00aa00, self.menu_rect)
-        draw_centered_text(self.canvas, self.font_30.render('Main Menu', True, 0xffffffff),
+        draw_centered_text(self.canvas, render_text(self.font_30, 'Main Menu', True, 0xffffffff),
                            self.main.x_center-RESULT_X_OFFSET, self.main.y_size-25)
         draw.rect(self.canvas, 0x00aa00, self.score_rect)
-        draw_centered_text(self.canvas, self.font_30.render('Leaderboards', True, 0xffffffff),
+        draw_centered_text(self.canvas, render_text(self.font_30, 'Leaderboards', True, 0xffffffff),
                            self.main.x_center+RESULT_X_OFFSET, self.main.y_size-25)
 
-    def run_easy_difficulty(self) -> None:
-        self.playing = Playing.CORE_GAME
-        self.last_game_mode = 'easy'
-        clear_canvas(self.canvas)
-        width, height = 11, 8
-        mine_count = 14
-        self.core = CoreGame(self.main, self.canvas, width, height, mine_count)
-        self.core.init()
-
-    def run_medium_difficulty(self) -> None:
-        self.playing = Playing.CORE_GAME
-        self.last_game_mode = 'medium'
+    def run_leaderboard(self) -> None:
         clear_canvas(self.canvas)
-        width, height = 21, 13
-        mine_count = 48
-        self.core = CoreGame(self.main, self.canvas, width, height, mine_count)
-        self.core.init()
-
-    def run_hard_difficulty(self) -> None:
+        draw_centered_text(self.canvas, render_text(self.font_50, 'Leaderboards', True, 0xff55ffff),
+                           self.main.x_center, 40)
+        category = self.leaderboard_category
+        draw_centered_text(self.canvas, render_text(self.font_30, f'\u2190  {category}  \u2192', True, 0xffffffff),
+                           self.main.x_center, 90)
+        best = self.leaderboard.best(category, self.leaderboard_order)
+        if best is None:
+            summary = 'No wins yet'
+        elif self.leaderboard_order == 'time':
+            summary = f'{self.leaderboard.wins(category)} wins, best {self.format_ticks(best)}'
+        else:
+            summary = f'{self.leaderboard.wins(category)} wins, best {self.main.TPS / best:.2f} 3BV/s'
+        other = next(order for order in ORDERS if order != self.leaderboard_order)
+        summary += f' (Tab: rank by {other})'
+        draw_centered_text(self.canvas, render_text(self.font_nerd_20, summary, True, 0xaaaaaaff),
+                           self.main.x_center, 125)
+        first_rank = (len(self.leaderboard_pages) - 1) * PAGE_SIZE + 1
+        for number, entry in enumerate(self.leaderboard_entries):
+            date = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry.date))
+            rate = f'{entry.bbbv * self.main.TPS / max(entry.ticks, 1):6.2f} 3BV/s' if entry.bbbv else ' ' * 12
+            text = f'{first_rank + number:>5}. {self.format_ticks(entry.ticks):>9}  {rate}   {date}'
+            draw_centered_text(self.canvas, render_text(self.font_nerd_20, text, True, 0xffffffff),
+                               self.main.x_center, 165 + 30*number)
+        draw.rect(self.canvas, 0x00aa00, self.menu_rect)
+        draw_centered_text(self.canvas, render_text(self.font_30, 'Back', True, 0xffffffff),
+                           self.main.x_center-RESULT_X_OFFSET, self.main.y_size-25)
+        if len(self.leaderboard_pages) > 1:
+            draw.rect(self.canvas, 0x00aa00, self.again_rect)
+            draw_centered_text(self.canvas, render_text(self.font_30, 'Previous', True, 0xffffffff),
+                               self.main.x_center, self.main.y_size-25)
+        if self.leaderboard_more:
+            draw.rect(self.canvas, 0x00aa00, self.score_rect)
+            draw_centered_text(self.canvas, render_text(self.font_30, 'Next', True, 0xffffffff),
+                               self.main.x_center+RESULT_X_OFFSET, self.main.y_size-25)
+
+    def format_ticks(self, ticks: int) -> str:
+        seconds = ticks / self.main.TPS
+        return f'{int(seconds) // 60:02d}:{seconds % 60:05.2f}'
+
+    def run_difficulty(self, game_mode: str) -> None:
+        """Start a game, using the size and mine count of a difficulty in `DIFFICULTIES` (or 'custom')."""
         self.playing = Playing.CORE_GAME
-        self.last_game_mode = 'hard'
-        clear_canvas(self.canvas)
-        width, height = 31, 17
-        mine_count = 110
-        self.core = CoreGame(self.main, self.canvas, width, height, mine_count)
+        self.last_game_mode = game_mode
+        self.auto_play = False
+        self.request_redraw()
+        width, height, mine_count = self.custom_size if game_mode == 'custom' else DIFFICULTIES[game_mode]
+        # and for "Play Again"
+        self.pool.want(width, height, mine_count, self.no_guess)
+        if self.atlas is None:
+            self.atlas = HexagonAtlas(self.canvas)
+        self.core = CoreGame(self.main, self.canvas, width, height, mine_count, no_guess=self.no_guess, pool=self.pool,
+                             atlas=self.atlas)
         self.core.init()
 
     #
     #
     #
 
-    def tick_loop(self) -> None:
-        """Called every tick/frame.
-        Redrawing the canvas is mandatory here (otherwise funny things happen when resizing).
+    def tick_loop(self) -> list[pygame.Rect]:
+        """Called every frame, after handling its events. Only redraws what changed (everything after `request_redraw`).
+        Return the areas of the canvas that have to be updated on the display.
         """
+        full_redraw = self.full_redraw
+        self.full_redraw = False
         if self.playing == Playing.MENU:
-            self.run_menu()
+            if full_redraw:
+                self.run_menu()
+                return [self.canvas.get_rect()]
+        elif self.playing == Playing.CUSTOM_MENU:
+            if full_redraw:
+                self.run_custom_menu()
+                return [self.canvas.get_rect()]
+        elif self.playing == Playing.LEADERBOARD:
+            if full_redraw:
+                self.run_leaderboard()
+                return [self.canvas.get_rect()]
         elif self.playing == Playing.CORE_GAME:
-            clear_canvas(self.canvas)
-            self.core.draw_all()
+            if self.auto_play:  # one move per frame, so you can watch it
+                move = self.core.next_move()
+                if move is None:
+                    self.auto_play = False  # only guesses left
+                else:
+                    self.after_move(self.core.play_move(*move))
+            if self.playing == Playing.CORE_GAME:
+                if full_redraw:
+                    self.core.request_redraw()
+                return self.core.draw_all()
+            return []
         elif self.playing == Playing.ENDING:
-            if self.core.frozen_timer_ticks is None:  # freeze the timer if we haven't already
-                self.core.frozen_timer_ticks = self.main.number_tick - self.core.tick_start
-            clear_canvas(self.canvas)
-            self.core.draw_all(game_ended=True)
-            self.run_result_menu()
-            text = 'YOU WON!' if self.core.game_won else 'GAME OVER'
-            draw_centered_text(self.canvas, self.font_50.render(text, True, 0xff55ffff), self.main.x_center, 35)
+            if full_redraw:  # nothing changes after the game ends
+                self.core.request_redraw()
+                self.core.draw_all(game_ended=True)
+                self.run_result_menu()
+                text = 'YOU WON!' if self.core.game_won else 'GAME OVER'
+                if self.core.practice:
+                    text += ' (practice)'
+                draw_centered_text(self.canvas, render_text(self.font_50, text, True, 0xff55ffff),
+                                   self.main.x_center, 35)
+                draw_centered_text(self.canvas, render_text(self.core.font_nerd_16, self.core.seed_text(), True,
+                                                            0xaaaaaaff), self.main.x_center, 68)
+                draw_centered_text(self.canvas, render_text(self.core.font_nerd_16, self.core.metrics_text(), True,
+                                                            0xaaaaaaff), self.main.x_center, 88)
+                return [self.canvas.get_rect()]
+        return []
+
+    def request_redraw(self) -> None:
+        """Redraw everything next frame, i.e. after the window was resized or the screen changed."""
+        self.full_redraw = True
+
+    def timeout(self) -> int | None:
+        """Get how long (in ms) until the screen changes by itself, if there are no events before that: 0 to draw the
+        next frame right away, or None if nothing changes until the next event.
+        """
+        if self.full_redraw:
+            return 0
+        if self.playing == Playing.CORE_GAME:
+            if self.auto_play:
+                return 0
+            return self.core.timeout()
+        return None
+
+    def open_custom_menu(self) -> None:
+        self.playing = Playing.CUSTOM_MENU
+        self.custom_text = [str(number) for number in self.custom_size]
+        self.custom_field = 0
+        self.custom_error = ''
+        self.request_redraw()
+
+    def start_custom(self) -> None:
+        """Start a custom game with what was typed in, or show what's wrong with it."""
+        if not all(self.custom_text):
+            self.custom_error = 'Fill in every number.'
+        else:
+            width, height, mine_count = map(int, self.custom_text)
+            try:
+                check_size(width, height, mine_count)
+            except ValueError as error:
+                self.custom_error = str(error)
+            else:
+                self.custom_size = width, height, mine_count
+                self.run_difficulty('custom')
+        self.request_redraw()
+
+    def handle_camera(self, event: pygame.event.Event) -> bool:
+        """Pan (middle mouse drag or the arrow keys) and zoom (mouse wheel or +/-) the board, or go back to fitting it
+        to the window (Home). Return whether the event was one of these.
+        """
+        if event.type == pygame.MOUSEWHEEL:
+            self.core.zoom(ZOOM_STEP ** event.y, *pygame.mouse.get_pos())
+        elif event.type == pygame.MOUSEMOTION and event.buttons[1]:
+            self.core.pan(*event.rel)
+        elif event.type != pygame.KEYDOWN:
+            return False
+        elif event.key in ARROW_PANS:
+            self.core.pan(*ARROW_PANS[event.key])
+        elif event.key in {pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS}:
+            self.core.zoom(ZOOM_STEP, self.main.x_center, self.main.y_center)
+        elif event.key in {pygame.K_MINUS, pygame.K_KP_MINUS}:
+            self.core.zoom(1 / ZOOM_STEP, self.main.x_center, self.main.y_center)
+        elif event.key == pygame.K_HOME:
+            self.core.reset_camera()
+        else:
+            return False
+        self.request_redraw()
+        return True
+
+    def after_move(self, still_alive: bool) -> None:
+        """Check if the game ended after a move."""
+        if not still_alive:
+            # game over
+            self.playing = Playing.ENDING
+            self.auto_play = False
+            self.request_redraw()
+            self.core.handle_defeat()
+            self.core.game_won = False
+            self.save_result()
+        else:
+            game_won = self.core.check_victory()
+            if game_won:
+                self.playing = Playing.ENDING
+                self.auto_play = False
+                self.request_redraw()
+                self.core.handle_victory()
+                self.core.game_won = True
+                self.save_result()
+
+    def save_result(self) -> None:
+        """Freeze the timer, and save the game that just ended (and its replay) in the background."""
+        core = self.core
+        core.frozen_timer_ticks = self.main.number_tick - core.tick_start
+        if core.practice:
+            return  # something was undone, or the solver helped, so it doesn't count
+        minefield = core.minefield
+        result = GameResult(board_category(core.width, core.height, core.mine_count, core.no_guess), core.game_won,
+                            core.frozen_timer_ticks, time.time(), minefield.seed, minefield.origin, minefield.symmetry,
+                            minefield.metrics.bbbv, len(core.recording))
+        # a copy, the game can go on after a loss (see `take_back`) while the writer thread hasn't saved it yet
+        self.leaderboard.submit(result, replace(core.recording, actions=bytearray(core.recording.actions)))
+
+    def take_back(self) -> None:
+        """Undo the click that lost the game, and keep playing (for practice, the loss was already saved)."""
+        core = self.core
+        if core.undo():
+            # the timer goes on from where it stopped, the time spent on the end screen doesn't count
+            core.tick_start = self.main.number_tick - core.frozen_timer_ticks
+            core.frozen_timer_ticks = None
+            self.playing = Playing.CORE_GAME
+            self.request_redraw()
+
+    def open_leaderboard(self, category: str) -> None:
+        self.playing = Playing.LEADERBOARD
+        self.leaderboard_category = category
+        self.leaderboard_pages = [None]
+        self.load_leaderboard_page()
+
+    def load_leaderboard_page(self) -> None:
+        """Get the page that starts at the last key in `leaderboard_pages` (only that page is read)."""
+        # one more than fits, to know if there's a next page
+        entries = self.leaderboard.page(self.leaderboard_category, self.leaderboard_pages[-1], PAGE_SIZE + 1,
+                                        self.leaderboard_order)
+        self.leaderboard_entries = entries[:PAGE_SIZE]
+        self.leaderboard_more = len(entries) > PAGE_SIZE
+        self.request_redraw()
+
+    def next_leaderboard_page(self) -> None:
+        if self.leaderboard_more:
+            self.leaderboard_pages.append(self.leaderboard_entries[-1].key)
+            self.load_leaderboard_page()
+
+    def previous_leaderboard_page(self) -> None:
+        if len(self.leaderboard_pages) > 1:
+            self.leaderboard_pages.pop()
+            self.load_leaderboard_page()
+
+    def switch_leaderboard(self, step: int) -> None:
+        """Show the next (or previous) leaderboard that has any wins."""
+        categories = self.leaderboard.categories()
+        if self.leaderboard_category not in categories:
+            categories = sorted([*categories, self.leaderboard_category])
+        number = categories.index(self.leaderboard_category)
+        self.open_leaderboard(categories[(number + step) % len(categories)])
+
+    def reorder_leaderboard(self) -> None:
+        """Switch between ranking by time and by 3BV/s, from the top."""
+        orders = list(ORDERS)
+        self.leaderboard_order = orders[(orders.index(self.leaderboard_order) + 1) % len(orders)]
+        self.open_leaderboard(self.leaderboard_category)
+
+    def close_leaderboard(self) -> None:
+        """Go back to the end of the game."""
+        self.playing = Playing.ENDING
+        self.request_redraw()
 
     def handle_event(self, event: pygame.event.Event) -> None:
         """Handle an event."""
@@ -168,39 +464,100 @@ class Game:
             if event.type == pygame.MOUSEBUTTONDOWN:
                 mouse_pos = pygame.mouse.get_pos()
                 if self.easy_rect.collidepoint(mouse_pos):
-                    self.run_easy_difficulty()
+                    self.run_difficulty('easy')
                 elif self.medium_rect.collidepoint(mouse_pos):
-                    self.run_medium_difficulty()
+                    self.run_difficulty('medium')
                 elif self.hard_rect.collidepoint(mouse_pos):
-                    self.run_hard_difficulty()
+                    self.run_difficulty('hard')
+                elif self.custom_rect.collidepoint(mouse_pos):
+                    self.open_custom_menu()
+                elif self.no_guess_rect.collidepoint(mouse_pos):
+                    self.no_guess = not self.no_guess
+                    self.request_redraw()
+
+        elif self.playing == Playing.CUSTOM_MENU:
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                mouse_pos = pygame.mouse.get_pos()
+                for number in range(len(CUSTOM_FIELDS)):
+                    if self.field_rect(number).collidepoint(mouse_pos):
+                        self.custom_field = number
+                        self.request_redraw()
+                if self.start_rect.collidepoint(mouse_pos):
+                    self.start_custom()
+                elif self.menu_rect.collidepoint(mouse_pos):
+                    self.playing = Playing.MENU
+                    self.request_redraw()
+            elif event.type == pygame.KEYDOWN:
+                text = self.custom_text[self.custom_field]
+                if event.key in {pygame.K_RETURN, pygame.K_KP_ENTER}:
+                    self.start_custom()
+                    return
+                if event.key == pygame.K_ESCAPE:
+                    self.playing = Playing.MENU
+                elif event.key == pygame.K_TAB and event.mod & pygame.KMOD_SHIFT or event.key == pygame.K_UP:
+                    self.custom_field = (self.custom_field - 1) % len(CUSTOM_FIELDS)
+                elif event.key in {pygame.K_TAB, pygame.K_DOWN}:
+                    self.custom_field = (self.custom_field + 1) % len(CUSTOM_FIELDS)
+                elif event.key == pygame.K_BACKSPACE:
+                    self.custom_text[self.custom_field] = text[:-1]
+                elif event.unicode.isdigit() and len(text) < 7:
+                    self.custom_text[self.custom_field] = text + event.unicode
+                self.custom_error = ''
+                self.request_redraw()
 
         elif self.playing == Playing.CORE_GAME:
+            if self.handle_camera(event):
+                return
             if event.type == pygame.MOUSEBUTTONDOWN:
-                still_alive = self.core.handle_click(event)
-                if not still_alive:
-                    # game over
-                    self.playing = Playing.ENDING
-                    clear_canvas(self.canvas)
-                    self.core.handle_defeat()
-                    self.core.game_won = False
-                else:
-                    game_won = self.core.check_victory()
-                    if game_won:
-                        self.playing = Playing.ENDING
-                        clear_canvas(self.canvas)
-                        self.core.handle_victory()
-                        self.core.game_won = True
+                self.after_move(self.core.handle_click(event))
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_h:
+                    self.core.show_hint()
+                elif event.key == pygame.K_a:
+                    self.auto_play = not self.auto_play
+                elif event.key == pygame.K_p:
+                    self.core.toggle_probabilities()
+                elif event.key == pygame.K_z:
+                    self.core.undo()
+                elif event.key == pygame.K_y:
+                    self.after_move(self.core.redo())
 
         elif self.playing == Playing.ENDING:
+            if self.handle_camera(event):
+                return
             if event.type == pygame.MOUSEBUTTONDOWN:
                 mouse_pos = pygame.mouse.get_pos()
                 if self.again_rect.collidepoint(mouse_pos):
-                    if self.last_game_mode == 'easy':
-                        self.run_easy_difficulty()
-                    elif self.last_game_mode == 'medium':
-                        self.run_medium_difficulty()
-                    elif self.last_game_mode == 'hard':
-                        self.run_hard_difficulty()
+                    self.run_difficulty(self.last_game_mode)
                 elif self.menu_rect.collidepoint(mouse_pos):
                     self.playing = Playing.MENU
-                    self.run_menu()
+                    self.request_redraw()
+                elif self.score_rect.collidepoint(mouse_pos):
+                    core = self.core
+                    self.open_leaderboard(board_category(core.width, core.height, core.mine_count, core.no_guess))
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_z and not self.core.game_won:
+                    self.take_back()
+
+        elif self.playing == Playing.LEADERBOARD:
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                mouse_pos = pygame.mouse.get_pos()
+                if self.menu_rect.collidepoint(mouse_pos):
+                    self.close_leaderboard()
+                elif self.again_rect.collidepoint(mouse_pos):
+                    self.previous_leaderboard_page()
+                elif self.score_rect.collidepoint(mouse_pos):
+                    self.next_leaderboard_page()
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    self.close_leaderboard()
+                elif event.key == pygame.K_LEFT:
+                    self.switch_leaderboard(-1)
+                elif event.key == pygame.K_RIGHT:
+                    self.switch_leaderboard(1)
+                elif event.key == pygame.K_TAB:
+                    self.reorder_leaderboard()
+                elif event.key == pygame.K_PAGEUP:
+                    self.previous_leaderboard_page()
+                elif event.key == pygame.K_PAGEDOWN:
+                    self.next_leaderboard_page()
@@ -0,0 +1,136 @@
+"""No-guess boards: mine layouts that can be solved from the first click with logic alone."""
+
+from __future__ import annotations
+
+import atexit
+import multiprocessing
+import os
+import random
+import time
+from typing import TYPE_CHECKING
+
+from board import FlagType, TileType
+from engine import Minefield
+from solver import Solver
+
+if TYPE_CHECKING:
+    import concurrent.futures
+
+
+ATTEMPTS_PER_JOB = 25  # layouts each worker checks before reporting back
+MAX_ATTEMPTS = 20000  # give up and use a normal board after this many (very dense boards are almost never solvable)
+MAX_SECONDS = 1.0  # or after this long, when a game is waiting for the board (dense boards are also slow to check)
+# give up right away on bigger boards, they're almost never solvable at normal densities (and every attempt is slower)
+MAX_AREA = 2000
+
+_executor: concurrent.futures.ProcessPoolExecutor = None
+
+
+def get_executor() -> concurrent.futures.ProcessPoolExecutor:
+    """Get the worker processes, which are started the first time and then kept for the next boards."""
+    global _executor
+    if _executor is None:
+        # only imported for the first no-guess board, it's not needed to start the game
+        import concurrent.futures
+        # not forked: by now this process has other threads (pregen, the leaderboard writer), and forking copies
+        # whatever locks they hold
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        _executor = concurrent.futures.ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                                           mp_context=multiprocessing.get_context(method))
+        atexit.register(_executor.shutdown, cancel_futures=True)
+    return _executor
+
+
+def is_solvable(width: int, height: int, mine_count: int, mines: list[int], first: tuple[int, int]) -> bool:
+    """Check if the solver can open the whole board from the first click, without guessing."""
+    minefield = Minefield(width, height, mine_count)
+    minefield.init()
+    minefield.place_mines(mines)
+    minefield.open_tile(*first)
+    solver = Solver(minefield)
+    flags = minefield.board.flags
+    while not minefield.check_victory():
+        solver.notify(minefield.changed_tiles)
+        minefield.changed_tiles.clear()
+        solver.solve()
+        safe = [index for index in solver.known_safe if flags[index] != FlagType.OPEN]
+        if not safe:
+            return False
+        for index in safe:
+            minefield.open_tile(*minefield.board.coordinate(index), clicked_by_user=False)
+    return True
+
+
+def solvable_starts(width: int, height: int, mine_count: int, mines: list[int]) -> list[int]:
+    """Get every first click that a layout can be solved from without guessing.
+    Only empty tiles (no mines around) can be first clicks, and every empty tile of the same opening opens exactly
+    the same tiles, so each opening only has to be checked once.
+    """
+    minefield = Minefield(width, height, mine_count)
+    minefield.init()
+    minefield.place_mines(mines)
+    board = minefield.board
+    empty = {index for index in board.indices
+             if board.tiles[index] != TileType.MINE and board.nearby_mines[index] == 0}
+    starts = []
+    while empty:
+        opening = [empty.pop()]
+        for index in opening:
+            for neighbor in board.neighbors(index):
+                if neighbor in empty:
+                    empty.remove(neighbor)
+                    opening.append(neighbor)
+        if is_solvable(width, height, mine_count, mines, board.coordinate(opening[0])):
+            starts.extend(opening)
+    return starts
+
+
+def _search(width: int, height: int, mine_count: int, first: tuple[int, int], job_seed: int,
+            attempts: int) -> tuple[int | None, int]:
+    """Try random layouts until one is solvable. Return its seed (or None), and how many were tried."""
+    rng = random.Random(job_seed)
+    minefield = Minefield(width, height, mine_count)
+    minefield.init()
+    origin = minefield.board.index(*first)
+    for attempt in range(1, attempts+1):
+        seed = rng.getrandbits(32)
+        if is_solvable(width, height, mine_count, minefield.layout(origin, seed), first):
+            return seed, attempt
+    return None, attempts
+
+
+def no_guess_layout(width: int, height: int, mine_count: int, first: tuple[int, int],
+                    executor: concurrent.futures.Executor = None,
+                    timeout: float | None = MAX_SECONDS) -> tuple[int | None, int]:
+    """Find a solvable layout, checking batches of layouts in parallel across the worker processes.
+    Return its seed for `Minefield.set_mines` (or None if it gave up after `MAX_ATTEMPTS` or `timeout` seconds, or the
+    board is bigger than `MAX_AREA`), and how many layouts were tried.
+    """
+    if width*height - (width-1)//2 > MAX_AREA:
+        return None, 0
+    import concurrent.futures
+    if executor is None:
+        executor = get_executor()
+    workers = getattr(executor, '_max_workers', 1)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    tried = 0
+    pending = set()
+    try:
+        while tried < MAX_ATTEMPTS:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            # keep every worker busy
+            while len(pending) < workers:
+                pending.add(executor.submit(_search, width, height, mine_count, first,
+                                            random.getrandbits(64), ATTEMPTS_PER_JOB))
+            done, pending = concurrent.futures.wait(pending, remaining, concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                seed, attempts = future.result()
+                tried += attempts
+                if seed is not None:
+                    return seed, tried
+        return None, tried
+    finally:
+        for future in pending:
+            future.cancel()
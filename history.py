@@ -0,0 +1,129 @@
+"""Undo and redo for a `Minefield`, stored as the flags that changed instead of copies of the board.
+
+Every action (a click, and everything it opened or revealed) is one `Step`: the tiles whose flag changed, with the
+flag before and after. Undo sets the old flags back and redo sets the new ones again, so both only touch the tiles
+that changed. Most of a flood fill is closed tiles with no flag that were opened, so those are only a list of indices
+that can be opened or closed again in one quick loop.
+
+When the steps get too big (`budget`), the oldest ones are folded into a checkpoint, a copy of the flags from before
+the oldest step that's left. Undoing past the last step goes back to the checkpoint in one jump.
+"""
+
+from __future__ import annotations
+
+import collections
+import re
+from array import array
+from dataclasses import dataclass, field
+
+from board import FlagType
+
+
+_CHANGED = re.compile(rb'[^\x00]')
+MIN_BUDGET = 100000  # tile changes kept, at least (4 to 6 bytes each)
+
+
+@dataclass
+class Step:
+    """What one action changed. A tile is either in `opened` or in the other changes, never both."""
+    opened: array = field(default_factory=lambda: array('i'))  # went from `NONE_CLOSED` to `OPEN`
+    # every other change, in order: the tile, and its flag before and after
+    indices: array = field(default_factory=lambda: array('i'))
+    old: bytearray = field(default_factory=bytearray)
+    new: bytearray = field(default_factory=bytearray)
+    alive: bool = True  # False if this was the click that lost the game
+
+    def __len__(self) -> int:
+        return len(self.opened) + len(self.indices)
+
+    def add(self, index: int, old: int, new: int) -> None:
+        self.indices.append(index)
+        self.old.append(old)
+        self.new.append(new)
+
+
+@dataclass
+class History:
+    budget: int
+    checkpoint: bytearray  # the flags before the oldest step in `undo_steps`
+
+    undo_steps: collections.deque[Step] = field(init=False, default_factory=collections.deque)
+    redo_steps: list[Step] = field(init=False, default_factory=list)
+    size: int = field(init=False, default=0)  # tile changes in both lists
+    current: Step = field(init=False, default=None)  # what the action being taken changes, until the next one
+
+    @classmethod
+    def for_flags(cls, flags: bytearray) -> History:
+        """Start a history from the board as it is, with a budget that scales with the board."""
+        return cls(max(MIN_BUDGET, 2 * len(flags)), bytearray(flags))
+
+    def begin(self) -> Step:
+        """Start recording a new action."""
+        self.end()
+        self.current = Step()
+        self.undo_steps.append(self.current)
+        return self.current
+
+    def end(self) -> None:
+        """Stop adding changes to the last step. Actions that didn't change anything aren't kept (there would be
+        nothing to undo), and the ones that did can't be redone past.
+        """
+        if self.current is None:
+            return
+        if len(self.current) == 0:
+            self.undo_steps.pop()
+        else:
+            self.size += len(self.current) - sum(len(step) for step in self.redo_steps)
+            self.redo_steps.clear()
+            self._trim()
+        self.current = None
+
+    def _trim(self) -> None:
+        """Fold the oldest steps into the checkpoint until everything fits in the budget (but keep the last one)."""
+        checkpoint = self.checkpoint
+        while self.size > self.budget and len(self.undo_steps) > 1:
+            step = self.undo_steps.popleft()
+            for index in step.opened:
+                checkpoint[index] = FlagType.OPEN
+            for index, flag in zip(step.indices, step.new):
+                checkpoint[index] = flag
+            self.size -= len(step)
+
+    def take_undo(self, flags: bytearray) -> Step | None:
+        """Get the step to undo (and move it to the redo list), or None if there's nothing to undo.
+        With no steps left, it's a step back to the checkpoint, if the board isn't there already.
+        """
+        self.end()
+        if self.undo_steps:
+            step = self.undo_steps.pop()
+        else:
+            step = self._to_checkpoint(flags)
+            if step is None:
+                return None
+            self.size += len(step)
+        self.redo_steps.append(step)
+        return step
+
+    def take_redo(self) -> Step | None:
+        """Get the step to redo (and move it back to the undo list), or None if there's nothing to redo."""
+        self.end()
+        if not self.redo_steps:
+            return None
+        step = self.redo_steps.pop()
+        self.undo_steps.append(step)
+        return step
+
+    def _to_checkpoint(self, flags: bytearray) -> Step | None:
+        """Get the difference between the checkpoint and the board, as a step that goes from one to the other."""
+        checkpoint = self.checkpoint
+        difference = int.from_bytes(flags, 'little') ^ int.from_bytes(checkpoint, 'little')
+        if difference == 0:
+            return None
+        step = Step()
+        for match in _CHANGED.finditer(difference.to_bytes(len(flags), 'little')):
+            index = match.start()
+            if checkpoint[index] == FlagType.NONE_CLOSED and flags[index] == FlagType.OPEN:
+                step.opened.append(index)
+            else:
+                step.add(index, checkpoint[index], flags[index])
+        return step
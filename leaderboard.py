@@ -0,0 +1,262 @@
+"""Local leaderboards: every finished game is appended to a log, and the wins are indexed by time in SQLite.
+
+The log is the record, the database is only an index over it (it remembers how much of the log it has read, and
+catches up with the rest as soon as it's used again, so it can be deleted and rebuilt any time).
+All writes happen on a background thread, so finishing a game never waits on the disk, and the game only reads it
+read-only, so it never waits on the writer's lock either.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import queue
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import TYPE_CHECKING
+
+import replay
+from engine import difficulty_name
+
+if TYPE_CHECKING:
+    import sqlite3
+
+    from replay import Recording
+
+
+RESULT_LOG = 'results.log'
+INDEX_FILE = 'leaderboard.sqlite3'
+PAGE_SIZE = 10
+CATCH_UP_BATCH = 10000  # log lines per transaction when rebuilding the index
+
+# bump this whenever the schema changes, and the index is built again from the log
+SCHEMA_VERSION = 2
+SCHEMA = [
+    '''CREATE TABLE wins (
+        id INTEGER PRIMARY KEY,
+        category TEXT NOT NULL,
+        ticks INTEGER NOT NULL,
+        date REAL NOT NULL,
+        seed INTEGER,
+        origin INTEGER,
+        symmetry INTEGER,
+        bbbv INTEGER,
+        clicks INTEGER,
+        -- ticks (at least 1) per 3BV, so ranking by it from the lowest is ranking by 3BV/s from the highest
+        pace REAL
+    )''',
+    'CREATE INDEX wins_by_time ON wins (category, ticks, date)',
+    'CREATE INDEX wins_by_pace ON wins (category, pace, date)',
+    'CREATE TABLE categories (category TEXT PRIMARY KEY, wins INTEGER NOT NULL) WITHOUT ROWID',
+    'CREATE TABLE meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL) WITHOUT ROWID',
+]
+# what each leaderboard can be ranked by, and the column that does it
+ORDERS = {'time': 'ticks', '3BV/s': 'pace'}
+
+
+def board_category(width: int, height: int, mine_count: int, no_guess: bool) -> str:
+    """Get the leaderboard a board belongs on. Only boards of the same size, mine count and no-guess setting are
+    ranked together.
+    """
+    name = difficulty_name(width, height, mine_count)
+    if name == 'custom':
+        name = f'{width}x{height}, {mine_count} mines'
+    return f'{name} (no-guess)' if no_guess else name
+
+
+@dataclass(frozen=True)
+class GameResult:
+    """One line of the log."""
+    category: str
+    won: bool
+    ticks: int
+    date: float  # Unix time
+    seed: int
+    origin: int
+    symmetry: int
+    # (not in the oldest results)
+    bbbv: int = None
+    clicks: int = None
+
+
+@dataclass(frozen=True)
+class Entry:
+    """One row of a leaderboard page."""
+    id: int
+    value: float  # whatever it's ranked by, see `ORDERS`
+    date: float
+    ticks: int
+    bbbv: int | None
+
+    @property
+    def key(self) -> tuple[float, float, int]:
+        """Where the next page starts, see `Leaderboard.page`."""
+        return self.value, self.date, self.id
+
+
+@dataclass
+class Leaderboard:
+    log_path: str = RESULT_LOG
+    index_path: str = INDEX_FILE
+    replay_path: str = replay.REPLAY_FILE
+
+    pending: queue.Queue[tuple[GameResult, Recording | None] | None] = \
+        field(init=False, default_factory=queue.Queue, repr=False)
+    thread: threading.Thread = field(init=False, default=None, repr=False)
+    reader: sqlite3.Connection = field(init=False, default=None, repr=False)  # only for the thread that reads
+
+    def _connect(self) -> sqlite3.Connection:
+        import sqlite3  # only once the leaderboards are used, it's not needed to start the game
+        connection = sqlite3.connect(self.index_path)
+        # WAL, so the game can read while the writer thread is writing
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        with connection:
+            # IMMEDIATE, so two games open at once can't both build it
+            connection.execute('BEGIN IMMEDIATE')
+            if connection.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                # it's only an index over the log, so an old one is thrown away (and caught up from the start)
+                for table in ['wins', 'categories', 'meta']:
+                    connection.execute(f'DROP TABLE IF EXISTS {table}')
+                for statement in SCHEMA:
+                    connection.execute(statement)
+                connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        return connection
+
+    def start(self) -> None:
+        """Start the writer thread, which first indexes whatever is in the log but not in the index yet."""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='leaderboard', daemon=True)
+            self.thread.start()
+            # finish writing the last game when quitting
+            atexit.register(self.close)
+
+    def submit(self, result: GameResult, recording: Recording = None) -> None:
+        """Save a finished game (and its replay) in the background."""
+        self.start()
+        self.pending.put((result, recording))
+
+    def close(self) -> None:
+        """Wait for everything that was submitted to be written."""
+        if self.thread is not None and self.thread.is_alive():
+            self.pending.put(None)
+            self.thread.join()
+
+    def _run(self) -> None:
+        connection = self._connect()
+        self._catch_up(connection)
+        while True:
+            items = [self.pending.get()]
+            # everything that's waiting goes in at once
+            while not self.pending.empty():
+                items.append(self.pending.get())
+            done = None in items
+            items = [item for item in items if item is not None]
+            if items:
+                self._write(items)
+                self._catch_up(connection)
+            if done:
+                connection.close()
+                return
+
+    def _write(self, items: list[tuple[GameResult, Recording | None]]) -> None:
+        with open(self.log_path, 'a', encoding='utf-8') as log:
+            log.writelines(json.dumps(asdict(result)) + '\n' for result, _ in items)
+        for _, recording in items:
+            if recording is not None:
+                try:
+                    replay.write(recording, self.replay_path)
+                except OSError as error:  # not worth losing the result over
+                    print(f'could not save the replay: {error}')
+
+    def _catch_up(self, connection: sqlite3.Connection) -> None:
+        """Index the part of the log that isn't indexed yet."""
+        row = connection.execute("SELECT value FROM meta WHERE key = 'log_offset'").fetchone()
+        offset = 0 if row is None else row[0]
+        if not os.path.exists(self.log_path) or os.path.getsize(self.log_path) <= offset:
+            return
+        with open(self.log_path, 'rb') as log:
+            log.seek(offset)
+            while True:
+                lines = log.readlines(CATCH_UP_BATCH * 100)
+                # a line that isn't finished yet is read again next time
+                if lines and not lines[-1].endswith(b'\n'):
+                    lines.pop()
+                if not lines:
+                    return
+                offset += sum(len(line) for line in lines)
+                results = [GameResult(**json.loads(line)) for line in lines]
+                wins = [(result.category, result.ticks, result.date, result.seed, result.origin, result.symmetry,
+                         result.bbbv, result.clicks, max(result.ticks, 1) / result.bbbv if result.bbbv else None)
+                        for result in results if result.won]
+                with connection:  # one transaction, so the offset always matches what's indexed
+                    connection.executemany('INSERT INTO wins (category, ticks, date, seed, origin, symmetry, bbbv, '
+                                           'clicks, pace) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', wins)
+                    connection.executemany('INSERT INTO categories VALUES (?, 1) '
+                                           'ON CONFLICT (category) DO UPDATE SET wins = wins + 1',
+                                           [(win[0],) for win in wins])
+                    connection.execute("INSERT OR REPLACE INTO meta VALUES ('log_offset', ?)", (offset,))
+
+    #
+    # reading (from the game's thread)
+    #
+
+    def _read(self, sql: str, parameters: tuple = ()) -> list[tuple]:
+        """Get the rows of a query, or none while the writer thread hasn't built the index yet."""
+        if self.reader is None:
+            # the first read catches up with the log too, not only the next game that's submitted
+            self.start()
+            self.reader = self._connect_reader()
+            if self.reader is None:
+                return []
+        return self.reader.execute(sql, parameters).fetchall()
+
+    def _connect_reader(self) -> sqlite3.Connection | None:
+        """Open the index read-only, or get None if it isn't there yet (or still has an old schema)."""
+        import pathlib
+        import sqlite3
+        # read-only, so nothing the game reads ever takes (or waits for) the write lock
+        uri = pathlib.Path(self.index_path).absolute().as_uri() + '?mode=ro'
+        try:
+            connection = sqlite3.connect(uri, uri=True)
+            version = connection.execute('PRAGMA user_version').fetchone()[0]
+        except sqlite3.OperationalError:  # not created yet
+            return None
+        if version != SCHEMA_VERSION:
+            connection.close()
+            return None
+        return connection
+
+    def categories(self) -> list[str]:
+        """Get every leaderboard that has at least one win."""
+        return [name for name, in self._read('SELECT category FROM categories ORDER BY category')]
+
+    def wins(self, category: str) -> int:
+        """Get the number of wins on a leaderboard."""
+        rows = self._read('SELECT wins FROM categories WHERE category = ?', (category,))
+        return rows[0][0] if rows else 0
+
+    def best(self, category: str, order: str = 'time') -> float | None:
+        """Get the best value of what a leaderboard is ranked by (see `ORDERS`, lower is better), or None if there
+        aren't any wins.
+        """
+        # MIN on the first column of the index after `category` is a single lookup
+        column = ORDERS[order]
+        rows = self._read(f'SELECT MIN({column}) FROM wins WHERE category = ?', (category,))
+        return rows[0][0] if rows else None
+
+    def page(self, category: str, after: tuple[float, float, int] = None, count: int = PAGE_SIZE,
+             order: str = 'time') -> list[Entry]:
+        """Get the next `count` wins on a leaderboard, best (then earliest) first, after the `key` of the last entry
+        on the previous page (or from the top). This walks the index from there, so every page is as fast as the
+        first one, no matter how deep it is.
+        """
+        column = ORDERS[order]
+        select = f'SELECT id, {column}, date, ticks, bbbv FROM wins WHERE category = ? AND {column} IS NOT NULL '
+        if after is None:
+            rows = self._read(select + f'ORDER BY {column}, date, id LIMIT ?', (category, count))
+        else:
+            rows = self._read(select + f'AND ({column}, date, id) > (?, ?, ?) ORDER BY {column}, date, id LIMIT ?',
+                              (category, *after, count))
+        return [Entry(*row) for row in rows]
@@ -6,12 +6,24 @@ from __future__ import annotations
 
 __version__ = 'beta-1.2.0'
 
-from dataclasses import dataclass, field
+import sys
+from dataclasses import dataclass
 from typing import ClassVar
 
-import pygame
+# pygame imports pkg_resources for `pygame.pkgdata` (which the game never uses), and that's about half of the startup
+# time. Without it, pkgdata falls back to finding its files next to the package, which works just as well.
+blocking = 'pkg_resources' not in sys.modules
+if blocking:
+    sys.modules['pkg_resources'] = None  # makes importing it fail
+try:
+    import pygame  # noqa: E402
+finally:
+    if blocking:
+        del sys.modules['pkg_resources']
 
-from game import Game
+from core import CoreGame  # noqa: E402
+from game import Game  # noqa: E402
+from profiling import Profiler  # noqa: E402
 
 
 WINDOW_FLAGS = pygame.RESIZABLE
@@ -23,8 +35,6 @@ class Main:
     x_size: int = 800
     y_size: int = 600
 
-    number_tick: int = field(init=False, default=0)
-
     @property
     def x_center(self) -> int:
         return self.x_size // 2
@@ -33,7 +43,20 @@ class Main:
     def y_center(self) -> int:
         return self.y_size // 2
 
-    def main(self) -> None:
+    @property
+    def number_tick(self) -> int:
+        """Ticks (of `TPS` per second) since the game started. Frames aren't drawn at a steady rate anymore, so this
+        comes from the clock instead of counting them.
+        """
+        return pygame.time.get_ticks() * self.TPS // 1000
+
+    def tick_to_ms(self, tick: int) -> int:
+        """Get when (in ms since the game started) `number_tick` gets to `tick`."""
+        return -(-tick * 1000 // self.TPS)
+
+    def main(self, profiler: Profiler = None) -> None:
+        if profiler is None:
+            profiler = Profiler()
         pygame.init()
         logo = pygame.image.load('assets/logo.png')
         pygame.display.set_icon(logo)
@@ -43,22 +66,42 @@ class Main:
 
         game = Game(self, canvas)
         game.run_menu()
+        profiler.instrument(CoreGame, 'draw_all', 'open_tile', 'handle_click')
 
         while True:
-            self.number_tick += 1
+            # When nothing moves by itself, sleep until there's an event (or the timer shows the next second), so an
+            # idle game uses next to no CPU. Otherwise (like auto-play), draw frames at up to `TPS`.
+            timeout = game.timeout()
+            events = []
+            if timeout != 0:
+                event = pygame.event.wait() if timeout is None else pygame.event.wait(timeout)
+                if event.type != pygame.NOEVENT:
+                    events.append(event)
             clock.tick(self.TPS)
-            game.tick_loop()
-            pygame.display.update()
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    return
-                if event.type == pygame.VIDEORESIZE:
-                    self.x_size = event.w
-                    self.y_size = event.h
-                    # while we would love to have a minimum size, that literally does not work in pygame
-                game.handle_event(event)
+            profiler.start_frame()
+            # events first, so whatever they change is drawn in the same frame
+            with profiler.phase('events'):
+                for event in events + pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        profiler.finish()
+                        pygame.quit()
+                        return
+                    if event.type == pygame.VIDEORESIZE:
+                        self.x_size = event.w
+                        self.y_size = event.h
+                        # while we would love to have a minimum size, that literally does not work in pygame
+                    if event.type in {pygame.VIDEORESIZE, pygame.WINDOWEXPOSED}:
+                        game.request_redraw()
+                    game.handle_event(event)
+            with profiler.phase('Game.tick_loop'):
+                dirty = game.tick_loop()
+            dirty = profiler.show_overlay(canvas, dirty, clock.get_fps(), self.TPS)
+            if dirty:
+                with profiler.phase('display.update'):
+                    pygame.display.update(dirty)
+            profiler.hide_overlay(canvas)
+            profiler.end_frame()
 
 
 if __name__ == '__main__':
-    Main().main()
+    Main().main(Profiler.from_command_line())
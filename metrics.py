@@ -0,0 +1,105 @@
+"""How hard a board is: the hex version of 3BV (the fewest clicks that can clear it), and the openings it's made of.
+
+This runs in `Minefield.set_mines` for every board, up to a million tiles, so nothing here looks at the tiles one at a
+time in Python. The masks are whole-board byte strings, combined as big integers (like the counts in
+`place_mines`), and openings are found by a union-find over runs of zeros within a row instead of over single tiles.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+from board import HexBoard, TileType
+
+
+# `HexBoard.tiles` to 1 for safe tiles and 0 for everything else (mines, and the border around the board)
+_SAFE = bytes.maketrans(bytes([TileType.SAFE, TileType.MINE]), b'\x01\x00')
+# `HexBoard.nearby_mines` to 1 for no mines around, 0 otherwise
+_ZERO = bytes([1] + [0]*255)
+_RUN = re.compile(rb'\x01+')
+
+
+@dataclass(frozen=True)
+class BoardMetrics:
+    bbbv: int  # 3BV: one click for every opening, plus one for every numbered tile that no opening uncovers
+    openings: int  # groups of connected tiles with no mines around them, which open all at once
+    largest_opening: int  # the most tiles with no mines around them in one opening (not counting its edge)
+    isolated: int  # numbered tiles that have to be clicked by themselves
+
+    def per_second(self, seconds: float) -> float:
+        """Get 3BV/s, for a game that cleared this board in `seconds`."""
+        return self.bbbv / seconds if seconds > 0 else 0.0
+
+    def efficiency(self, clicks: int) -> float:
+        """Get 3BV per click: 1.0 (or more, with chording) is a perfect game."""
+        return self.bbbv / clicks if clicks > 0 else 0.0
+
+
+def measure(board: HexBoard) -> BoardMetrics:
+    """Get the metrics of a board that has its mines placed."""
+    size = len(board.valid)
+    safe = int.from_bytes(board.tiles.translate(_SAFE), 'little')
+    zero = safe & int.from_bytes(board.nearby_mines.translate(_ZERO), 'little')
+    # next to a zero: the zeros shifted by every neighbor offset (the border is never a zero, so nothing wraps)
+    next_to_zero = 0
+    for offset in board.neighbor_offsets:
+        next_to_zero |= zero << (8*offset) if offset > 0 else zero >> (-8*offset)
+    isolated = (safe & ~(zero | next_to_zero)).to_bytes(size, 'little').count(1)
+    openings, largest = _openings(zero.to_bytes(size, 'little'), board.stride)
+    return BoardMetrics(openings + isolated, openings, largest, isolated)
+
+
+def _openings(zero: bytes, stride: int) -> tuple[int, int]:
+    """Count the connected groups of 1s in a mask, and get the size of the biggest one.
+    Each row's zeros come in runs (the border columns are always 0, so runs never cross rows). A tile at k touches
+    k-stride and k-stride+1 in the row above, so the run [start, end) touches the run [above_start, above_end) in the
+    row above if `above_start + stride - 1 < end` and `above_end + stride > start`. Runs are found in order, so the
+    runs of the row above only have to be swept through once.
+    """
+    starts = []
+    ends = []
+    for match in _RUN.finditer(zero):
+        start, end = match.span()
+        starts.append(start)
+        ends.append(end)
+    parent = list(range(len(starts)))
+    sizes = [end - start for start, end in zip(starts, ends)]
+    groups = len(starts)
+    row = -2
+    row_first = 0  # the first run of this row
+    above = above_end = 0  # the runs of the row above that could still touch this one are [above, above_end)
+    for run in range(len(starts)):
+        start = starts[run]
+        run_row = start // stride
+        if run_row != row:
+            # the previous row is only above this one if it's the one right before it
+            above, above_end = (row_first, run) if run_row == row + 1 else (run, run)
+            row = run_row
+            row_first = run
+        # skip the runs above that end before this one starts, they can't touch any later ones either
+        low = start - stride
+        while above < above_end and ends[above] <= low:
+            above += 1
+        high = ends[run] - stride + 1
+        root = run  # always the root of this run's group, nothing else changes it during the loop
+        touching = above
+        while touching < above_end and starts[touching] < high:
+            other = touching
+            while parent[other] != other:
+                parent[other] = parent[parent[other]]  # path halving
+                other = parent[other]
+            if other != root:
+                # union by size, the smaller group goes under the bigger one
+                if sizes[other] < sizes[root]:
+                    other, root = root, other
+                parent[root] = other
+                sizes[other] += sizes[root]
+                root = other
+                groups -= 1
+            touching += 1
+        # the last run that touched this one can also touch the next run in this row
+        if touching > above:
+            above = touching - 1
+    largest = max((sizes[run] for run in range(len(parent)) if parent[run] == run), default=0)
+    return groups, largest
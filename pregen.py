@@ -0,0 +1,145 @@
+"""No-guess boards generated in the background while you play, so starting the next game doesn't have to wait."""
+
+from __future__ import annotations
+
+import collections
+import random
+import threading
+from array import array
+from dataclasses import dataclass, field
+
+import generation
+from engine import Minefield
+
+
+QUEUE_SIZE = 3  # layouts kept ready for each kind of board
+
+# width, height, mines
+BoardKind = tuple[int, int, int]
+
+
+@dataclass
+class Template:
+    """A ready mine layout (`Minefield.layout(origin, seed)`), and every first click it works for, before it's moved
+    around by a symmetry.
+    """
+    seed: int
+    origin: int
+    starts: frozenset[int]
+
+
+@dataclass
+class PregenPool:
+    """Keeps a few layouts ready for each kind of no-guess board that was asked for, generated on a background thread.
+    A layout depends on the first click, so `take` looks for a template (moved by one of the board's symmetries) that
+    works for it. If none do, it returns None, and the board has to be generated right away like before.
+    Normal boards aren't kept: placing their mines right away is as fast as moving a ready layout around.
+    """
+    size: int = QUEUE_SIZE
+    hits: int = 0
+    misses: int = 0
+
+    queues: dict[BoardKind, collections.deque[Template]] = field(init=False, default_factory=dict, repr=False)
+    wanted: list[BoardKind] = field(init=False, default_factory=list)  # most recently wanted first
+    # by size, built on the background thread along with the first template
+    inverses: dict[tuple[int, int], list[array]] = field(init=False, default_factory=dict, repr=False)
+    condition: threading.Condition = field(init=False, default_factory=threading.Condition, repr=False)
+    thread: threading.Thread = field(init=False, default=None, repr=False)
+    rng: random.Random = field(init=False, default_factory=random.Random, repr=False)
+
+    def want(self, width: int, height: int, mine_count: int, no_guess: bool) -> None:
+        """Start keeping layouts ready for this kind of board (if it's a no-guess board that's not bigger than
+        `generation.MAX_AREA`).
+        """
+        if not no_guess or width*height - (width-1)//2 > generation.MAX_AREA:
+            return
+        kind = width, height, mine_count
+        with self.condition:
+            if kind in self.wanted:
+                self.wanted.remove(kind)
+            self.wanted.insert(0, kind)
+            self.queues.setdefault(kind, collections.deque())
+            if self.thread is None:
+                # daemon, so it never keeps the game open
+                self.thread = threading.Thread(target=self._run, name='pregen', daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def take(self, width: int, height: int, mine_count: int, no_guess: bool,
+             first: int) -> tuple[int, int, int] | None:
+        """Get a ready layout for a first click (by index), as the (seed, origin, symmetry) for `Minefield.reproduce`.
+        Return None if there isn't one that works.
+        """
+        if not no_guess:
+            return None
+        with self.condition:
+            queue = self.queues.get((width, height, mine_count))
+            if not queue:
+                self.misses += 1
+                return None
+            inverses = self.inverses[width, height]
+            for template in queue:
+                for number, inverse in enumerate(inverses):
+                    if inverse[first] in template.starts:
+                        queue.remove(template)
+                        self.hits += 1
+                        self.condition.notify()  # make another one
+                        return template.seed, template.origin, number
+            self.misses += 1
+            return None
+
+    def ready(self, width: int, height: int, mine_count: int, no_guess: bool) -> int:
+        """Get how many layouts are ready for this kind of board."""
+        with self.condition:
+            return len(self.queues.get((width, height, mine_count), ())) if no_guess else 0
+
+    def _inverse_symmetries(self, width: int, height: int) -> list[array]:
+        """Get the inverse of each symmetry of the board, which maps a first click back to the template."""
+        if (width, height) not in self.inverses:
+            minefield = Minefield(width, height, 0)
+            minefield.init()
+            inverses = []
+            # (the same ones `Minefield.reproduce` uses, so they're ready for the game's thread too)
+            for symmetry in minefield.symmetries():
+                inverse = array('i', symmetry)
+                for index in minefield.board.indices:
+                    inverse[symmetry[index]] = index
+                inverses.append(inverse)
+            self.inverses[width, height] = inverses
+        return self.inverses[width, height]
+
+    def _next_kind(self) -> BoardKind | None:
+        for kind in self.wanted:
+            if len(self.queues[kind]) < self.size:
+                return kind
+        return None
+
+    def _run(self) -> None:
+        while True:
+            with self.condition:
+                kind = self.condition.wait_for(self._next_kind)
+            template = self._generate(kind)
+            if template is not None:
+                # here, so `take` never has to work them out on the game's thread
+                self._inverse_symmetries(kind[0], kind[1])
+            with self.condition:
+                if template is not None:
+                    self.queues[kind].append(template)
+                elif kind in self.wanted:
+                    self.wanted.remove(kind)  # too dense to ever be solvable, don't keep trying
+
+    def _generate(self, kind: BoardKind) -> Template | None:
+        width, height, mine_count = kind
+        minefield = Minefield(width, height, mine_count)
+        minefield.init()
+        board = minefield.board
+        origin = self.rng.choice(board.indices)
+        # the solver runs in the worker processes, so this thread is mostly waiting on them (and nothing is waiting on
+        # this thread, so it only gives up after `MAX_ATTEMPTS`)
+        seed, _ = generation.no_guess_layout(width, height, mine_count, board.coordinate(origin), timeout=None)
+        if seed is None:
+            return None
+        # it was only checked from `origin`, but it usually works from some other openings too
+        future = generation.get_executor().submit(generation.solvable_starts, width, height, mine_count,
+                                                  minefield.layout(origin, seed))
+        return Template(seed, origin, frozenset(future.result()))
@@ -0,0 +1,231 @@
+"""Exact mine probabilities, for when you have to guess."""
+
+from __future__ import annotations
+
+import functools
+import math
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from board import FlagType
+from engine import Minefield
+from solver import Solver
+
+
+@functools.lru_cache(maxsize=65536)
+def _comb(n: int, k: int) -> int:
+    """Number of ways to place k mines in n tiles. The same few are needed over and over."""
+    if k < 0 or k > n:
+        return 0
+    return math.comb(n, k)
+
+
+def _convolve(a: dict[int, int], b: dict[int, int]) -> dict[int, int]:
+    """Combine two (mines -> number of solutions) distributions."""
+    result = {}
+    for mines_a, ways_a in a.items():
+        for mines_b, ways_b in b.items():
+            result[mines_a + mines_b] = result.get(mines_a + mines_b, 0) + ways_a*ways_b
+    return result
+
+
+@dataclass
+class Component:
+    """Every solution of one independent piece of the frontier, by how many mines they use.
+    Tiles that touch exactly the same numbers are interchangeable, so they're grouped, and a solution only says how
+    many mines each group has.
+    """
+    groups: list[tuple[int, ...]]
+    weights: dict[int, int] = field(default_factory=dict)  # mines -> number of solutions
+    # mines -> for each group, sum of (solutions * mines in that group), divide by the group size to get one tile
+    mined: dict[int, list[int]] = field(default_factory=dict)
+
+    @classmethod
+    def enumerate(cls, groups: list[tuple[int, ...]], constraints: list[tuple[int, list[int]]]) -> Component:
+        """Find every solution with backtracking.
+        :constraints: (mines, group numbers) for each number touching the groups
+        """
+        component = cls(groups)
+        group_constraints = [[] for _ in groups]
+        for constraint_number, (_, constraint_groups) in enumerate(constraints):
+            for group in constraint_groups:
+                group_constraints[group].append(constraint_number)
+        need = [mines for mines, _ in constraints]  # mines still needed by each constraint
+        left = [sum(len(groups[group]) for group in constraint_groups) for _, constraint_groups in constraints]
+        sizes = [len(group) for group in groups]
+        assignment = [0] * len(groups)
+
+        def place(group: int, mines: int, weight: int) -> None:
+            if group == len(groups):
+                component.weights[mines] = component.weights.get(mines, 0) + weight
+                mined = component.mined.setdefault(mines, [0] * len(groups))
+                for other, count in enumerate(assignment):
+                    mined[other] += weight*count
+                return
+            size = sizes[group]
+            touching = group_constraints[group]
+            for count in range(size + 1):
+                # every constraint needs to still be satisfiable by the tiles that are left
+                if any(need[c] < count for c in touching):
+                    break  # more mines won't work either
+                if any(need[c] - count > left[c] - size for c in touching):
+                    continue
+                for c in touching:
+                    need[c] -= count
+                    left[c] -= size
+                assignment[group] = count
+                place(group + 1, mines + count, weight * _comb(size, count))
+                for c in touching:
+                    need[c] += count
+                    left[c] += size
+            assignment[group] = 0
+
+        place(0, 0, 1)
+        return component
+
+
+@dataclass
+class ProbabilityEngine:
+    """Computes the exact chance that each closed tile is a mine, given the numbers and the total mine count.
+    The frontier is split into independent components that are enumerated separately, and the rest of the closed
+    tiles (the interior) all share one probability. Components are cached, so only the ones touched by a move are
+    enumerated again. Call `notify` with the tiles that changed after every action, like `Solver`.
+    """
+    minefield: Minefield
+    solver: Solver
+
+    frontier: set[int] = field(init=False, default_factory=set)  # opened tiles that might touch closed tiles
+    cache: dict[tuple[frozenset, frozenset], Component] = field(init=False, default_factory=dict, repr=False)
+
+    def __post_init__(self):
+        board = self.minefield.board
+        self.frontier.update(index for index in board.indices if board.flags[index] == FlagType.OPEN)
+
+    def notify(self, changed: Iterable[int]) -> None:
+        """Update the frontier with tiles that changed since the last call."""
+        flags = self.minefield.board.flags
+        self.frontier.update(index for index in changed if flags[index] == FlagType.OPEN)
+
+    def _constraints(self) -> dict[int, tuple[int, list[int]]]:
+        """Get (mines, unknown tiles) around each opened tile that still touches an unknown tile."""
+        board = self.minefield.board
+        flags = board.flags
+        known_safe = self.solver.known_safe
+        known_mines = self.solver.known_mines
+        constraints = {}
+        for index in list(self.frontier):
+            mines = board.nearby_mines[index]
+            unknown = []
+            closed = False
+            for neighbor in board.neighbors(index):
+                if flags[neighbor] == FlagType.OPEN:
+                    continue
+                closed = True
+                if neighbor in known_mines:
+                    mines -= 1
+                elif neighbor not in known_safe:
+                    unknown.append(neighbor)
+            if not closed:
+                self.frontier.discard(index)  # nothing around it to figure out anymore
+            elif unknown:
+                constraints[index] = mines, unknown
+        return constraints
+
+    def _components(self, constraints: dict[int, tuple[int, list[int]]]) -> list[Component]:
+        """Split the constraints into independent components, enumerating the ones that aren't cached."""
+        tile_constraints = {}
+        for index, (_, unknown) in constraints.items():
+            for tile in unknown:
+                tile_constraints.setdefault(tile, []).append(index)
+        components = []
+        new_cache = {}
+        seen = set()
+        for start in tile_constraints:
+            if start in seen:
+                continue
+            # breadth first, so constraints are completed soon after they're started (which prunes a lot more)
+            seen.add(start)
+            tiles = [start]
+            component_constraints = []
+            seen_constraints = set()
+            for tile in tiles:
+                for index in tile_constraints[tile]:
+                    if index in seen_constraints:
+                        continue
+                    seen_constraints.add(index)
+                    component_constraints.append(index)
+                    for other in constraints[index][1]:
+                        if other not in seen:
+                            seen.add(other)
+                            tiles.append(other)
+            key = frozenset(tiles), frozenset((index, constraints[index][0]) for index in component_constraints)
+            component = self.cache.get(key)
+            if component is None:
+                # group tiles by which constraints they're in, keeping the breadth first order
+                by_constraints = {}
+                for tile in tiles:
+                    by_constraints.setdefault(tuple(tile_constraints[tile]), []).append(tile)
+                groups = [tuple(group) for group in by_constraints.values()]
+                group_of = {tile: number for number, group in enumerate(groups) for tile in group}
+                component = Component.enumerate(groups, [
+                    (constraints[index][0], sorted({group_of[tile] for tile in constraints[index][1]}))
+                    for index in component_constraints
+                ])
+            new_cache[key] = component
+            components.append(component)
+        # anything that wasn't used this time was changed by a move, and won't come back
+        self.cache = new_cache
+        return components
+
+    def compute(self) -> tuple[dict[int, float], float]:
+        """Get the mine probability of every closed tile next to a number, and the probability shared by all the
+        other closed tiles.
+        """
+        minefield = self.minefield
+        area = minefield.width*minefield.height - (minefield.width-1)//2
+        closed = area - minefield.opened_count
+        if not minefield.mines_set:
+            return {}, minefield.mine_count / closed
+        self.solver.solve()
+        known_safe = self.solver.known_safe
+        known_mines = self.solver.known_mines
+        probabilities = dict.fromkeys(known_safe, 0.0)
+        probabilities.update(dict.fromkeys(known_mines, 1.0))
+
+        components = self._components(self._constraints())
+        mines_left = minefield.mine_count - len(known_mines)
+        interior = closed - len(probabilities) - sum(len(group) for c in components for group in c.groups)
+
+        # distributions of every other component put together, using prefix and suffix products
+        prefix = [{0: 1}]
+        for component in components:
+            prefix.append(_convolve(prefix[-1], component.weights))
+        suffix = [{0: 1}]
+        for component in reversed(components):
+            suffix.append(_convolve(suffix[-1], component.weights))
+        suffix.reverse()
+        total = prefix[-1]
+        # every way to finish a frontier solution is a way to put the rest of the mines in the interior
+        normalizer = sum(ways * _comb(interior, mines_left - mines) for mines, ways in total.items())
+
+        for number, component in enumerate(components):
+            others = _convolve(prefix[number], suffix[number + 1])
+            for mines, mined in component.mined.items():
+                outside = sum(ways * _comb(interior, mines_left - mines - other_mines)
+                              for other_mines, ways in others.items())
+                if outside == 0:
+                    continue
+                for group, group_mined in zip(component.groups, mined):
+                    for tile in group:
+                        probabilities[tile] = probabilities.get(tile, 0) + group_mined*outside
+            for group in component.groups:
+                for tile in group:
+                    probabilities[tile] = probabilities.get(tile, 0) / (len(group) * normalizer)
+
+        if interior == 0:
+            interior_probability = 0.0
+        else:
+            interior_mined = sum(ways * _comb(interior, mines_left - mines) * (mines_left - mines)
+                                 for mines, ways in total.items())
+            interior_probability = interior_mined / (interior * normalizer)
+        return probabilities, interior_probability
@@ -0,0 +1,214 @@
+"""Opt-in profiling, to see where the frame time goes.
+
+Run `python main.py --profile` (or set HEXAMINE_PROFILE=1) to time every part of a frame, and show the rolling
+p50/p99 of each in an overlay. Give it a range of frames, like `--profile 600-900` (or HEXAMINE_PROFILE=600-900), to
+also run cProfile over just those frames. That's saved to a .prof file, which works with pstats, snakeviz, or
+flameprof (for a flamegraph).
+"""
+
+from __future__ import annotations
+
+import argparse
+import collections
+import contextlib
+import functools
+import os
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Iterator
+
+import pygame
+
+from fonts import NERD, get_font
+
+if TYPE_CHECKING:
+    import cProfile
+
+
+ENV_VAR = 'HEXAMINE_PROFILE'
+WINDOW = 600  # samples kept for the percentiles (10 seconds of frames)
+OVERLAY_REFRESH = 15  # frames between re-rendering the overlay, which isn't free either
+OVERLAY_POSITION = (5, 35)  # under the HUD
+
+_NOT_PROFILING = contextlib.nullcontext()
+
+
+def parse_frames(text: str) -> tuple[int, int] | None:
+    """Parse the value of `--profile`: a range of frames like '600-900' (end excluded), or anything else to only
+    turn on the overlay.
+    """
+    start, dash, end = text.partition('-')
+    if not dash:
+        return None
+    if not (start.isdigit() and end.isdigit() and int(start) < int(end)):
+        raise ValueError(f'frames should look like 600-900, not {text!r}')
+    return int(start), int(end)
+
+
+@dataclass
+class Profiler:
+    """Times named phases into rolling windows of samples. Does nothing at all unless it's `enabled`."""
+    enabled: bool = False
+    frames: tuple[int, int] = None  # [start, end) to run cProfile over, by frame number
+    output: str = None  # where that goes
+
+    samples: dict[str, collections.deque[float]] = field(init=False, default_factory=dict, repr=False)
+    frame: int = field(init=False, default=0)
+    frame_start: float = field(init=False, default=0.0)
+    profile: cProfile.Profile = field(init=False, default=None, repr=False)
+    overlay: pygame.Surface = field(init=False, default=None, repr=False)
+    under_overlay: pygame.Surface = field(init=False, default=None, repr=False)  # what the overlay covers up
+
+    @classmethod
+    def from_command_line(cls, args: list[str] = None) -> Profiler:
+        """Set it up from `--profile` (which takes precedence) or the environment variable."""
+        parser = argparse.ArgumentParser(description='HexaMine')
+        parser.add_argument('--profile', nargs='?', const='on', default=os.environ.get(ENV_VAR), metavar='FRAMES',
+                            help=f'show frame timings, and run cProfile over FRAMES (like 600-900) if given '
+                                 f'(also ${ENV_VAR})')
+        parser.add_argument('--profile-output', metavar='PATH',
+                            help='where to save the cProfile stats (hexamine-START-END.prof by default)')
+        parsed = parser.parse_args(args)
+        if not parsed.profile:
+            return cls()
+        try:
+            frames = parse_frames(parsed.profile)
+        except ValueError as error:
+            parser.error(str(error))
+        output = parsed.profile_output
+        if frames is not None and output is None:
+            output = f'hexamine-{frames[0]}-{frames[1]}.prof'
+        return cls(True, frames, output)
+
+    #
+    #
+    #
+
+    def record(self, name: str, seconds: float) -> None:
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = collections.deque(maxlen=WINDOW)
+        samples.append(seconds)
+
+    def phase(self, name: str) -> contextlib.AbstractContextManager:
+        """Time a `with` block as `name`."""
+        if not self.enabled:
+            return _NOT_PROFILING
+        return self._timed(name)
+
+    @contextlib.contextmanager
+    def _timed(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def instrument(self, cls: type, *names: str) -> None:
+        """Time every call to these methods of a class, named like 'CoreGame.draw_all'."""
+        if not self.enabled:
+            return
+        for name in names:
+            setattr(cls, name, self._timed_method(f'{cls.__name__}.{name}', getattr(cls, name)))
+
+    def _timed_method(self, name: str, method: Callable) -> Callable:
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - start)
+        return timed
+
+    def start_frame(self) -> None:
+        if not self.enabled:
+            return
+        self.frame += 1
+        if self.frames is not None and self.frames[0] <= self.frame < self.frames[1]:
+            if self.profile is None:
+                import cProfile  # only when it's used, it's not needed to start the game
+                self.profile = cProfile.Profile()
+            self.profile.enable()
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self) -> None:
+        """Record the whole frame (everything but waiting for the next one)."""
+        if not self.enabled:
+            return
+        self.record('frame', time.perf_counter() - self.frame_start)
+        if self.profile is not None:
+            # not while waiting for the next frame, that would be most of the profile
+            self.profile.disable()
+            if self.frame == self.frames[1] - 1:
+                self.dump()
+
+    def dump(self) -> None:
+        """Stop cProfile and save what it has."""
+        if self.profile is None:
+            return
+        import pstats
+        self.profile.disable()
+        self.profile.dump_stats(self.output)
+        print(f'profiled frames {self.frames[0]} to {self.frame}, saved to {self.output}')
+        pstats.Stats(self.profile).sort_stats('cumulative').print_stats(15)
+        self.profile = None
+
+    def finish(self) -> None:
+        """Call when quitting, to save the profile (even if it didn't get to the end) and print the timings."""
+        if not self.enabled:
+            return
+        self.dump()
+        print(self.report())
+
+    #
+    #
+    #
+
+    def percentiles(self, name: str) -> tuple[float, float]:
+        """Get the p50 and p99 of the recent samples, in seconds."""
+        samples = sorted(self.samples[name])
+        return samples[len(samples) // 2], samples[min(len(samples)-1, int(0.99 * len(samples)))]
+
+    def lines(self, fps: float, tps: int) -> list[str]:
+        frame_p50, frame_p99 = self.percentiles('frame')
+        lines = [f'{fps:5.1f} fps  budget {frame_p50*tps:4.0%} p50 {frame_p99*tps:4.0%} p99',
+                 f'{"":<22}{"p50":>7}{"p99":>7}']
+        for name in self.samples:
+            if name != 'frame':
+                p50, p99 = self.percentiles(name)
+                lines.append(f'{name:<22}{p50*1e3:7.2f}{p99*1e3:7.2f} ms')
+        return lines
+
+    def report(self) -> str:
+        lines = [f'{"phase":<22}{"p50":>7}{"p99":>7}']
+        for name in self.samples:
+            p50, p99 = self.percentiles(name)
+            lines.append(f'{name:<22}{p50*1e3:7.2f}{p99*1e3:7.2f} ms  ({len(self.samples[name])} samples)')
+        return '\n'.join(lines)
+
+    def show_overlay(self, canvas: pygame.Surface, dirty: list[pygame.Rect], fps: float,
+                     tps: int) -> list[pygame.Rect]:
+        """Draw the timings over the canvas, and add them to the areas to update. Call `hide_overlay` after updating
+        the display, which puts back what was under it, so the overlay never ends up in what the game draws.
+        """
+        if not self.enabled or 'frame' not in self.samples:
+            return dirty
+        if self.overlay is None or self.frame % OVERLAY_REFRESH == 0:
+            font = get_font(NERD, 13)
+            # not through `render_text`, these change all the time and would push the game's labels out of the cache
+            texts = [font.render(line, True, 0xffff55ff) for line in self.lines(fps, tps)]
+            height = font.get_linesize()
+            self.overlay = pygame.Surface((max(text.get_width() for text in texts) + 8, height*len(texts) + 8),
+                                          pygame.SRCALPHA)
+            self.overlay.fill((0, 0, 0, 190))
+            self.overlay.blits([(text, (4, 4 + height*number)) for number, text in enumerate(texts)], doreturn=False)
+        rect = self.overlay.get_rect(topleft=OVERLAY_POSITION).clip(canvas.get_rect())
+        self.under_overlay = canvas.subsurface(rect).copy()
+        canvas.blit(self.overlay, rect.topleft)
+        return [*dirty, rect]
+
+    def hide_overlay(self, canvas: pygame.Surface) -> None:
+        if self.under_overlay is not None:
+            canvas.blit(self.under_overlay, OVERLAY_POSITION)
+            self.under_overlay = None
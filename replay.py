@@ -0,0 +1,169 @@
+"""Game recordings, and replaying them through the rules with no display.
+
+A recording is the board (size, mines and where the layout came from, see `Minefield.reproduce`) and every action the
+player took, packed into a few bytes each. Finished games are appended to `REPLAY_FILE`, one after another.
+Run `python replay.py [FILE]` to replay every game in a file and check that they all end the way they did.
+"""
+
+from __future__ import annotations
+
+import argparse
+import enum
+import struct
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import BinaryIO, Iterator
+
+from engine import Minefield, difficulty_name
+
+
+REPLAY_FILE = 'replays.hxr'
+MAGIC = b'HXR1'
+# magic, width, height, mines, seed, origin (board index), symmetry, no-guess, number of actions
+HEADER = struct.Struct('<4sHHIIIBBI')
+# (tick << 2) | action, i, j
+ACTION = struct.Struct('<Ihh')
+MAX_TICK = (1 << 30) - 1  # about 200 days at 60 TPS
+
+
+class Action(enum.IntEnum):
+    OPEN = 0  # left click, which is also a chord on an opened tile
+    FLAG = 1  # right click, which also takes flags off
+    QUESTION = 2  # shift right click
+
+
+@dataclass
+class Recording:
+    width: int
+    height: int
+    mine_count: int
+    no_guess: bool = False
+    # where the mines came from, only known after the first click
+    seed: int = None
+    origin: int = None
+    symmetry: int = 0
+    actions: bytearray = field(default_factory=bytearray)  # packed with `ACTION`
+
+    @property
+    def difficulty(self) -> str:
+        return difficulty_name(self.width, self.height, self.mine_count)
+
+    def __len__(self) -> int:
+        return len(self.actions) // ACTION.size
+
+    def add(self, tick: int, action: Action, i: int, j: int) -> None:
+        """Record an action, `tick` ticks after the timer started."""
+        self.actions += ACTION.pack(min(tick, MAX_TICK) << 2 | action, i, j)
+
+    def set_board(self, minefield: Minefield) -> None:
+        """Keep where the mines of a game came from."""
+        self.seed = minefield.seed
+        self.origin = minefield.origin
+        self.symmetry = minefield.symmetry
+
+    def iter_actions(self) -> Iterator[tuple[int, Action, int, int]]:
+        """Get every (tick, action, i, j)."""
+        for packed, i, j in ACTION.iter_unpack(self.actions):
+            yield packed >> 2, Action(packed & 3), i, j
+
+    def to_bytes(self) -> bytes:
+        if self.seed is None:
+            raise ValueError('the mines were never placed')
+        header = HEADER.pack(MAGIC, self.width, self.height, self.mine_count, self.seed, self.origin, self.symmetry,
+                             self.no_guess, len(self))
+        return header + self.actions
+
+
+def write(recording: Recording, path: str = REPLAY_FILE) -> None:
+    """Add a recording to the end of a file."""
+    with open(path, 'ab') as file:
+        file.write(recording.to_bytes())
+
+
+def read(file: BinaryIO) -> Iterator[Recording]:
+    """Get every recording in a file, in order."""
+    while header := file.read(HEADER.size):
+        if len(header) != HEADER.size:
+            raise ValueError('the file ends in the middle of a recording')
+        magic, width, height, mine_count, seed, origin, symmetry, no_guess, count = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f'not a recording: {magic!r}')
+        actions = bytearray(file.read(count * ACTION.size))
+        if len(actions) != count * ACTION.size:
+            raise ValueError('the file ends in the middle of a recording')
+        yield Recording(width, height, mine_count, bool(no_guess), seed, origin, symmetry, actions)
+
+
+#
+#
+#
+
+
+@dataclass
+class ReplayResult:
+    won: bool
+    alive: bool
+    actions: int  # how many were played (all of them, unless it's invalid)
+    ticks: int  # of the last action, i.e. the time it took if the game ended
+
+
+def replay(recording: Recording) -> ReplayResult:
+    """Play a recording through the rules. Raise a ValueError if any action is impossible (off the board, or after
+    the game already ended).
+    """
+    minefield = Minefield(recording.width, recording.height, recording.mine_count)
+    minefield.init()
+    board = minefield.board
+    if recording.seed is None or recording.origin not in board.indices:
+        raise ValueError('the mines were never placed')
+    mines = minefield.layout(recording.origin, recording.seed)
+    if recording.symmetry != 0:
+        mapping = minefield.symmetries()[recording.symmetry]
+        mines = [mapping[index] for index in mines]
+    minefield.place_mines(mines, recording.seed, recording.origin, recording.symmetry)
+
+    alive = True
+    won = False
+    played = 0
+    tick = 0
+    for packed, i, j in ACTION.iter_unpack(recording.actions):
+        if not alive or won:
+            raise ValueError(f'action {played} is after the game ended')
+        if (i, j) not in board:
+            raise ValueError(f'action {played} is off the board: {i},{j}')
+        tick = packed >> 2
+        if packed & 3 == Action.OPEN:
+            alive = minefield.open_tile(i, j)
+            won = alive and minefield.check_victory()
+        else:
+            minefield.flag_tile(i, j, question=packed & 3 == Action.QUESTION)
+        played += 1
+    return ReplayResult(won, alive, played, tick)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('file', nargs='?', default=REPLAY_FILE)
+    args = parser.parse_args()
+    with open(args.file, 'rb') as file:
+        recordings = list(read(file))
+    counts = {'won': 0, 'lost': 0, 'unfinished': 0, 'invalid': 0}
+    start = time.perf_counter()
+    for number, recording in enumerate(recordings):
+        try:
+            result = replay(recording)
+        except ValueError as error:
+            print(f'game {number} ({recording.difficulty}): {error}')
+            counts['invalid'] += 1
+            continue
+        counts['won' if result.won else 'lost' if not result.alive else 'unfinished'] += 1
+    elapsed = time.perf_counter() - start
+    print(f'{len(recordings)} games in {elapsed*1000:.1f}ms ({len(recordings)/max(elapsed, 1e-9):.0f} games/s): '
+          + ', '.join(f'{count} {name}' for name, count in counts.items()))
+    if counts['invalid']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
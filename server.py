@@ -0,0 +1,292 @@
+"""Play many games at once for players over TCP, with the same rules as the game (see `engine`) and no display.
+
+Every connection can play any number of games at once, each one a session with a number the client picks. Requests
+and responses are little-endian binary, with no framing beyond their fixed sizes:
+
+    request:  `REQUEST`  session, `Op`, i, j
+    response: `RESPONSE` session, `Status`, milliseconds since the first click, tile count; then `TILE` for every tile
+              that changed: i, j, its `FlagType`, and the mines around it (only for opened tiles, or after the game)
+
+`Op.NEW` starts a new game in a session, with the difficulty number (in the order of `DIFFICULTIES`) as i. Opening a
+tile that's already open chords it, like clicking it in the game. `Op.CLOSE` ends a session, and anything sent after it
+with the same number is for a new one. Every request gets exactly one response, in order for each session.
+
+Requests are handled in batches: everything that arrives in one turn of the event loop is handled together, and each
+connection gets one write. No session gets more than `TURN_LIMIT` actions in a turn, so a busy one can't hold up the
+others. A session with `QUEUE_LIMIT` actions waiting stops its connection from being read until it catches up (and so
+does a client that isn't reading its responses), which makes the client's writes wait instead of the server's memory
+grow.
+
+Run `python server.py` to serve on localhost, and `python -m bench.server` to load test it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import collections
+import enum
+import functools
+import struct
+from dataclasses import dataclass, field
+
+from board import FlagType
+from engine import DIFFICULTIES, Minefield
+
+
+HOST = '127.0.0.1'
+PORT = 7667
+REQUEST = struct.Struct('<IBhh')
+RESPONSE = struct.Struct('<IBII')
+TILE = struct.Struct('<hhBB')
+QUEUE_LIMIT = 32  # actions waiting for one session before its connection stops being read (after the current read)
+TURN_LIMIT = 4  # actions for one session in one batch
+SIZES = list(DIFFICULTIES.values())  # by difficulty number
+OPEN = int(FlagType.OPEN)
+
+
+@functools.lru_cache
+def coordinates(width: int, height: int) -> list[tuple[int, int] | None]:
+    """Get the i,j of every index of a board size (None off the board), so responses don't have to work them out."""
+    minefield = Minefield(width, height, 0)
+    minefield.init()
+    board = minefield.board
+    return [board.coordinate(index) if board.valid[index] else None for index in range(len(board.valid))]
+
+
+class Op(enum.IntEnum):
+    NEW = 0
+    OPEN = 1
+    FLAG = 2
+    QUESTION = 3
+    CLOSE = 4  # end the session
+
+
+class Status(enum.IntEnum):
+    PLAYING = 0
+    LOST = 1
+    WON = 2
+    INVALID = 3  # no game in the session, the game is over, not on the board, or not a request
+
+
+@dataclass(eq=False)  # by identity, to be kept in sets
+class Session:
+    number: int
+    minefield: Minefield = None  # None until `Op.NEW`
+    status: Status = Status.PLAYING
+    started: float = None  # loop time of the first click
+    ended: float = None
+    queue: collections.deque[tuple[int, int, int]] = field(default_factory=collections.deque)  # op, i, j
+
+    def milliseconds(self, now: float) -> int:
+        """Get the time on the game's timer (it stops when the game ends)."""
+        if self.started is None:
+            return 0
+        return int(1000 * ((self.ended if self.ended is not None else now) - self.started))
+
+    def handle(self, op: int, i: int, j: int, now: float) -> bytes:
+        """Make one move, and get the response to it."""
+        if op == Op.NEW:
+            if not 0 <= i < len(SIZES):
+                return self.respond(Status.INVALID, now)
+            self.minefield = Minefield(*SIZES[i])
+            self.minefield.init()
+            self.status = Status.PLAYING
+            self.started = self.ended = None
+            return self.respond(Status.PLAYING, now)
+        if op == Op.CLOSE:
+            return RESPONSE.pack(self.number, self.status, self.milliseconds(now), 0)
+        minefield = self.minefield
+        if minefield is None or self.status != Status.PLAYING or not Op.OPEN <= op <= Op.QUESTION \
+                or (i, j) not in minefield.board:
+            return self.respond(Status.INVALID, now)
+        if op == Op.OPEN:
+            alive = minefield.open_tile(i, j)
+            if self.started is None and minefield.mines_set:
+                self.started = now
+            if not alive:
+                minefield.show_all_mines_losing()
+                self.status = Status.LOST
+            elif minefield.check_victory():
+                minefield.show_all_mines_winning()
+                self.status = Status.WON
+            if self.status != Status.PLAYING:
+                self.ended = now
+        else:
+            minefield.flag_tile(i, j, question=op == Op.QUESTION)
+        return self.respond(self.status, now)
+
+    def respond(self, status: Status, now: float) -> bytes:
+        """Get a response with every tile that changed since the last one."""
+        minefield = self.minefield
+        if minefield is None:
+            return RESPONSE.pack(self.number, status, 0, 0)
+        flags = minefield.board.flags
+        nearby_mines = minefield.board.nearby_mines
+        places = coordinates(minefield.width, minefield.height)
+        changed = minefield.changed_tiles
+        # the numbers on closed tiles are only given away once the game is over
+        show_all = self.status != Status.PLAYING
+        parts = [RESPONSE.pack(self.number, status, self.milliseconds(now), len(changed))]
+        for index in changed:
+            flag = flags[index]
+            parts.append(TILE.pack(*places[index], flag, nearby_mines[index] if flag == OPEN or show_all else 0))
+        changed.clear()
+        return b''.join(parts)
+
+
+class Connection(asyncio.Protocol):
+    """One client, with all of its sessions."""
+
+    def __init__(self, server: Server):
+        self.server = server
+        self.transport: asyncio.Transport = None
+        self.buffer = b''  # the start of a request that hasn't all arrived yet
+        self.sessions: dict[int, Session] = {}
+        self.ready: collections.deque[Session] = collections.deque()  # sessions with actions waiting
+        self.full: set[Session] = set()  # sessions at `QUEUE_LIMIT`, until they're down to half of it
+        self.reading = True
+        self.writing = True  # False while the client isn't reading its responses fast enough
+        self.closed = False
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        self.transport = transport
+        self.server.connections.add(self)
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        self.closed = True
+        self.server.connections.discard(self)
+        self.server.sessions -= len(self.sessions)
+
+    def data_received(self, data: bytes) -> None:
+        buffer = self.buffer + data if self.buffer else data
+        end = len(buffer) - len(buffer) % REQUEST.size
+        self.buffer = buffer[end:]
+        if end == 0:
+            return
+        sessions = self.sessions
+        for number, op, i, j in REQUEST.iter_unpack(buffer[:end] if end < len(buffer) else buffer):
+            session = sessions.get(number)
+            if session is None:
+                session = sessions[number] = Session(number)
+                self.server.sessions += 1
+            queue = session.queue
+            if not queue:
+                self.ready.append(session)
+            queue.append((op, i, j))
+            if len(queue) >= QUEUE_LIMIT:
+                self.full.add(session)
+        if self.full:
+            self.pause_reading()
+        self.server.want_turn(self)
+
+    def pause_reading(self) -> None:
+        if self.reading:
+            self.reading = False
+            self.transport.pause_reading()
+
+    def resume_reading(self) -> None:
+        if not self.reading and self.writing and not self.full and not self.closed:
+            self.reading = True
+            self.transport.resume_reading()
+
+    def pause_writing(self) -> None:
+        self.writing = False
+        self.pause_reading()
+
+    def resume_writing(self) -> None:
+        self.writing = True
+        self.resume_reading()
+        if self.ready:
+            self.server.want_turn(self)
+
+    def take_turn(self, now: float) -> int:
+        """Handle up to `TURN_LIMIT` actions for every session that has any, and send the responses all at once.
+        Return how many actions were handled.
+        """
+        responses = []
+        ready = self.ready
+        for _ in range(len(ready)):
+            session = ready.popleft()
+            queue = session.queue
+            for _ in range(min(TURN_LIMIT, len(queue))):
+                op, i, j = queue.popleft()
+                responses.append(session.handle(op, i, j, now))
+                if op == Op.CLOSE:
+                    self.close(session)
+                    break
+            queue = session.queue
+            if queue:
+                ready.append(session)
+            if session in self.full and len(queue) <= QUEUE_LIMIT // 2:
+                self.full.discard(session)
+        self.transport.write(b''.join(responses))
+        self.resume_reading()
+        return len(responses)
+
+    def close(self, session: Session) -> None:
+        """End a session. Whatever it still has waiting was sent after the `Op.CLOSE`, so it goes to a new session with
+        the same number (in the next turn).
+        """
+        number = session.number
+        del self.sessions[number]
+        self.server.sessions -= 1
+        if session.queue:
+            new = self.sessions[number] = Session(number, queue=session.queue)
+            self.server.sessions += 1
+            session.queue = collections.deque()
+            self.ready.append(new)
+            if len(new.queue) >= QUEUE_LIMIT:
+                self.full.add(new)
+
+
+class Server:
+    def __init__(self):
+        self.connections: set[Connection] = set()
+        self.sessions = 0
+        self.actions = 0
+        self.waiting: dict[Connection, None] = {}  # connections with actions for the next turn, in order
+        self.loop = asyncio.get_running_loop()
+
+    def want_turn(self, connection: Connection) -> None:
+        """Handle the actions of this connection in the next batch."""
+        if not self.waiting:
+            self.loop.call_soon(self.take_turn)
+        self.waiting[connection] = None
+
+    def take_turn(self) -> None:
+        """Handle a batch: a turn for every connection that has actions waiting (and can take the responses)."""
+        waiting = self.waiting
+        self.waiting = {}
+        now = self.loop.time()
+        for connection in waiting:
+            if connection.closed or not connection.writing:
+                continue  # `resume_writing` asks for another turn
+            self.actions += connection.take_turn(now)
+            if connection.ready:
+                self.want_turn(connection)
+
+
+async def serve(host: str = HOST, port: int = PORT) -> None:
+    """Serve until cancelled."""
+    server = Server()
+    listener = await server.loop.create_server(lambda: Connection(server), host, port, backlog=1024)
+    host, port = listener.sockets[0].getsockname()[:2]
+    print(f'serving on {host}:{port}', flush=True)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT, help='0 for any free port')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
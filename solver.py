@@ -0,0 +1,131 @@
+"""Logic-only solver. Finds tiles that are certainly safe or certainly mines, from the numbers on opened tiles."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from board import FlagType
+from engine import Minefield
+
+
+_OPEN = int(FlagType.OPEN)  # plain ints are much faster to compare than enum members
+
+
+@dataclass
+class Solver:
+    """Deduces safe tiles and mines with the single-point and subset/overlap rules.
+    It only looks at the numbers (never the player's flags), and only re-examines the opened tiles around whatever
+    changed, so every move costs about the same no matter how big the board is.
+    Call `notify` with the tiles that changed after every action.
+    """
+    minefield: Minefield
+
+    known_safe: set[int] = field(init=False, default_factory=set)  # closed tiles that can't be mines
+    known_mines: set[int] = field(init=False, default_factory=set)
+    to_check: set[int] = field(init=False, default_factory=set)  # opened tiles that might give something new
+
+    def __post_init__(self):
+        board = self.minefield.board
+        self.to_check.update(index for index in board.indices if board.flags[index] == _OPEN)
+
+    def notify(self, changed: Iterable[int]) -> None:
+        """Update the frontier with tiles that changed since the last call."""
+        flags = self.minefield.board.flags
+        for index in changed:
+            if flags[index] == _OPEN:
+                self.known_safe.discard(index)
+                self.to_check.add(index)
+                # one less unknown tile around each of these
+                self.to_check.update(self._opened_around(index))
+
+    def _opened_around(self, index: int) -> list[int]:
+        """Get the opened tiles around a tile."""
+        # the border around the board is never opened, so it doesn't need to be checked for
+        flags = self.minefield.board.flags
+        return [index + offset for offset in self.minefield.board.neighbor_offsets if flags[index + offset] == _OPEN]
+
+    def _constraint(self, index: int) -> tuple[frozenset[int], int]:
+        """Get the unknown tiles around an opened tile, and how many of them are mines."""
+        board = self.minefield.board
+        flags = board.flags
+        valid = board.valid
+        known_safe = self.known_safe
+        known_mines = self.known_mines
+        mines = board.nearby_mines[index]
+        unknown = []
+        for offset in board.neighbor_offsets:
+            neighbor = index + offset
+            if not valid[neighbor] or flags[neighbor] == _OPEN or neighbor in known_safe:
+                continue
+            if neighbor in known_mines:
+                mines -= 1
+            else:
+                unknown.append(neighbor)
+        return frozenset(unknown), mines
+
+    def _mark(self, tiles: Iterable[int], mine: bool) -> bool:
+        """Mark unknown tiles as safe or mines. Return whether there were any."""
+        known = self.known_mines if mine else self.known_safe
+        found = False
+        for index in tiles:
+            if index in known:
+                continue
+            known.add(index)
+            found = True
+            # the constraints of all the opened tiles around it changed
+            self.to_check.update(self._opened_around(index))
+        return found
+
+    def _overlapping(self, index: int, tiles: frozenset[int]) -> set[int]:
+        """Get the other opened tiles that share some of the unknown tiles of this one."""
+        overlapping = set()
+        for tile in tiles:
+            overlapping.update(self._opened_around(tile))
+        overlapping.discard(index)
+        return overlapping
+
+    def solve(self) -> None:
+        """Apply the rules until nothing new can be deduced."""
+        while self.to_check:
+            index = self.to_check.pop()
+            tiles, mines = self._constraint(index)
+            if not tiles:
+                continue
+            # single point: all of them are safe, or all of them are mines
+            if mines == 0:
+                self._mark(tiles, mine=False)
+                continue
+            if mines == len(tiles):
+                self._mark(tiles, mine=True)
+                continue
+            # subset/overlap: compare with every constraint that shares some tiles
+            for other in self._overlapping(index, tiles):
+                other_tiles, other_mines = self._constraint(other)
+                only_this = tiles - other_tiles
+                only_other = other_tiles - tiles
+                # there are between `mines - len(only_this)` and `mines` mines in the shared tiles
+                if other_mines - mines == len(only_other):
+                    found = self._mark(only_other, mine=True) | self._mark(only_this, mine=False)
+                elif mines - other_mines == len(only_this):
+                    found = self._mark(only_this, mine=True) | self._mark(only_other, mine=False)
+                else:
+                    found = False
+                if found:
+                    # this constraint changed, look at it again later
+                    self.to_check.add(index)
+                    break
+
+    def next_move(self) -> tuple[int, bool] | None:
+        """Get a tile that is certainly safe (to open) or certainly a mine (to flag), safe tiles first.
+        Return (index, is it a mine), or None if the only option left is to guess.
+        """
+        self.solve()
+        flags = self.minefield.board.flags
+        for index in self.known_safe:
+            if flags[index] != FlagType.OPEN:
+                return index, False
+        for index in self.known_mines:
+            if flags[index] != FlagType.FLAGGED:
+                return index, True
+        return None
@@ -0,0 +1,45 @@
+"""Drawing only what changed has to end up with the same picture as drawing everything."""
+
+from __future__ import annotations
+
+import os
+import random
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+import pygame  # noqa: E402
+
+from board import TileType  # noqa: E402
+from core import HUD_HEIGHT, HUD_TOP, CoreGame  # noqa: E402
+from main import Main  # noqa: E402
+
+
+def test_hud_fits_above_the_board() -> None:
+    pygame.init()
+    core = CoreGame(Main(), pygame.Surface((800, 600)), 11, 8, 14)
+    assert HUD_TOP + core.font_nerd_20.get_linesize() <= HUD_HEIGHT
+
+
+def test_incremental_frames_match_a_full_redraw() -> None:
+    pygame.init()
+    random.seed(3)
+    main = Main()
+    for width, height, mine_count in [(61, 33, 440), (121, 65, 1760)]:
+        core = CoreGame(main, pygame.Surface((main.x_size, main.y_size)), width, height, mine_count)
+        core.init()
+        board = core.board
+        core.minefield.set_mines(board.coordinate(board.indices[len(board.indices) // 2]))
+        core.draw_all()
+        mines = [index for index in board.indices if board.tiles[index] == TileType.MINE]
+        safe = [index for index in board.indices if board.tiles[index] != TileType.MINE]
+        for _ in range(20):
+            # flags change the mine count in the HUD, and its width with it
+            core.minefield.flag_tile(*board.coordinate(random.choice(mines)))
+            core.minefield.open_tile(*board.coordinate(random.choice(safe)), clicked_by_user=False)
+            core.draw_all()
+        incremental = core.canvas.copy()
+        core.request_redraw()
+        core.draw_all()
+        difference = [(x, y) for x in range(main.x_size) for y in range(main.y_size)
+                      if incremental.get_at((x, y)) != core.canvas.get_at((x, y))]
+        assert not difference, difference[:10]
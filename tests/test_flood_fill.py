@@ -0,0 +1,51 @@
+"""Opening one tile of a huge, nearly empty board floods it all at once, without recursion."""
+
+from __future__ import annotations
+
+import sys
+
+from board import FlagType
+from engine import Minefield
+
+
+def test_huge_sparse_board() -> None:
+    minefield = Minefield(999, 1000, 3)
+    minefield.init()
+    board = minefield.board
+    indices = board.indices
+    # all in one corner, so every safe tile is reachable from the others
+    mines = [indices[0], indices[1], indices[2]]
+    minefield.place_mines(mines)
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(100)  # far less than any recursive flood fill would need
+    try:
+        assert minefield.open_tile(*board.coordinate(indices[len(indices) // 2]))
+    finally:
+        sys.setrecursionlimit(limit)
+
+    safe = set(indices) - set(mines)
+    assert len(safe) == len(indices) - 3 > 990000
+    assert minefield.opened_count == len(safe)
+    assert minefield.changed_tiles == safe
+    assert all(board.flags[index] == FlagType.OPEN for index in safe)
+    assert all(board.flags[index] == FlagType.NONE_CLOSED for index in mines)
+    assert minefield.check_victory()
+    minefield._check_counters()
+
+
+def test_flood_returns_opened_tiles() -> None:
+    minefield = Minefield(999, 1000, 1)
+    minefield.init()
+    board = minefield.board
+    minefield.place_mines([board.indices[-1]])
+    # flags in the way are opened too (and taken off the counts)
+    flagged = board.indices[1000]
+    minefield.flag_tile(*board.coordinate(flagged))
+    assert minefield.flag_count == 1
+    minefield.changed_tiles.clear()
+    opened = minefield._flood_open(board.indices[len(board.indices) // 2])
+    assert len(opened) == len(set(opened)) == len(board.indices) - 1
+    assert flagged in opened
+    assert minefield.flag_count == 0
+    assert minefield.changed_tiles == set(opened)
+    minefield._check_counters()
@@ -0,0 +1,108 @@
+"""Undo and redo against a record of every state the board was in: random flags, question flags, openings and chords,
+with losses taken back, and budgets small enough that the oldest steps are folded into the checkpoint.
+"""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from board import FlagType
+from engine import Minefield
+
+
+def snapshot(minefield: Minefield) -> tuple:
+    """Everything undo and redo have to put back: the flags, what's counted from them, and the counters."""
+    minefield._check_counters()
+    board = minefield.board
+    return (bytes(board.flags), bytes(board.nearby_flagged), bytes(board.nearby_questions), minefield.opened_count,
+            minefield.flag_count, minefield.question_count, minefield.incorrect_flag_count)
+
+
+def lost(minefield: Minefield) -> bool:
+    return FlagType.POST_GAME_LOSS_CAUSE in minefield.board.flags
+
+
+@pytest.mark.parametrize('seed', range(6))
+@pytest.mark.parametrize('budget', [20, 200, None])
+def test_random_play(seed: int, budget: int | None) -> None:
+    rng = random.Random(seed)
+    minefield = Minefield(21, 13, 30)
+    minefield.init()
+    minefield.keep_history()
+    if budget is not None:
+        minefield.history.budget = budget
+    board = minefield.board
+    indices = board.indices
+    minefield.set_mines(board.coordinate(indices[len(indices) // 2]), rng.getrandbits(32))
+
+    # every state the board went through that can still be redone to, and where it is now
+    timeline = [snapshot(minefield)]
+    position = 0
+    bottom = 0  # the oldest state undo still reaches (it moves up when steps are folded into the checkpoint)
+
+    def undo() -> bool:
+        nonlocal position, bottom
+        if not minefield.undo():
+            assert snapshot(minefield) == timeline[position]
+            bottom = position
+            return False
+        state = snapshot(minefield)
+        # one step back, or back to the checkpoint
+        position = max(number for number in range(bottom, position) if timeline[number] == state)
+        return True
+
+    def redo() -> bool | None:
+        nonlocal position
+        alive = minefield.redo()
+        state = snapshot(minefield)
+        if alive is None:
+            assert position == len(timeline) - 1 and state == timeline[position]
+        else:
+            position = min(number for number in range(position + 1, len(timeline)) if timeline[number] == state)
+            assert alive == (not lost(minefield))
+        return alive
+
+    for _ in range(300):
+        if minefield.check_victory():
+            break
+        choice = rng.random()
+        if choice < 0.1:
+            undo()
+            continue
+        if choice < 0.15:
+            redo()
+            if lost(minefield):
+                assert undo()  # taken back, like the game does
+            continue
+        i, j = board.coordinate(rng.choice(indices))
+        if choice < 0.65:
+            alive = minefield.open_tile(i, j)
+            if not alive:
+                minefield.show_all_mines_losing()  # part of the same step
+        else:
+            minefield.flag_tile(i, j, question=choice >= 0.9)
+        history = minefield.history
+        history.end()
+        # the oldest steps were folded into the checkpoint (but never the last one)
+        assert history.size <= history.budget or len(history.undo_steps) <= 1
+        state = snapshot(minefield)
+        if state != timeline[position]:
+            # a new action can't be redone past
+            del timeline[position + 1:]
+            timeline.append(state)
+            position += 1
+        if lost(minefield):
+            assert undo()
+            assert not lost(minefield)
+
+    # all the way back, and all the way forward again (including a loss that was just taken back)
+    while undo():
+        pass
+    if budget is None:
+        assert position == 0
+    while redo() is not None:
+        pass
+    assert position == len(timeline) - 1
+
@@ -0,0 +1,60 @@
+"""`CoreGame.tile_at` only looks at the nearest hexagon, which has to hit exactly the same tiles as checking all of
+them (the way clicks used to be handled).
+"""
+
+from __future__ import annotations
+
+import math
+import os
+
+import pytest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+import pygame  # noqa: E402
+
+from core import HUD_HEIGHT, CoreGame  # noqa: E402
+from engine import DIFFICULTIES  # noqa: E402
+from main import Main  # noqa: E402
+
+
+def scan_hits(core: CoreGame) -> dict[tuple[int, int], tuple[int, int]]:
+    """Get the tile every hit pixel is on, by checking every tile (within a box around each one)."""
+    layout = core.layout
+    limit = 0.8660254037844386*layout.hexagon_radius - 2
+    hits = {}
+    for i, j in core.board:
+        x, y = layout.to_canvas(i, j)
+        for pixel_x in range(math.floor(x - limit), math.ceil(x + limit) + 1):
+            for pixel_y in range(max(HUD_HEIGHT, math.floor(y - limit)), math.ceil(y + limit) + 1):
+                if math.sqrt((x - pixel_x) ** 2 + (y - pixel_y) ** 2) < limit:
+                    assert (pixel_x, pixel_y) not in hits, 'tiles overlap'
+                    hits[pixel_x, pixel_y] = (i, j)
+    return hits
+
+
+@pytest.mark.parametrize('window', [(800, 600), (640, 900)])
+@pytest.mark.parametrize('difficulty', list(DIFFICULTIES))
+def test_same_tiles_as_scan(window: tuple[int, int], difficulty: str) -> None:
+    pygame.init()
+    main = Main(*window)
+    core = CoreGame(main, pygame.Surface(window), *DIFFICULTIES[difficulty])
+    core.init()
+    hits = scan_hits(core)
+    assert hits
+    for x in range(main.x_size):
+        for y in range(0, main.y_size, 3):
+            assert core.tile_at(x, y) == hits.get((x, y)), (x, y)
+
+
+def test_same_tiles_with_camera() -> None:
+    pygame.init()
+    main = Main()
+    core = CoreGame(main, pygame.Surface((main.x_size, main.y_size)), 61, 33, 440)
+    core.init()
+    core.zoom(1.7, 300, 200)
+    core.pan(-123.4, 56.7)
+    hits = scan_hits(core)
+    for x in range(main.x_size):
+        for y in range(0, main.y_size, 3):
+            assert core.tile_at(x, y) == hits.get((x, y)), (x, y)
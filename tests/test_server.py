@@ -0,0 +1,48 @@
+"""Sessions on one connection: closing one and starting it again in the same write."""
+
+from __future__ import annotations
+
+import asyncio
+
+from server import HOST, REQUEST, RESPONSE, SIZES, TILE, TURN_LIMIT, Connection, Op, Server, Status, coordinates
+
+
+async def exchange(requests: list[tuple[int, int, int, int]]) -> tuple[list[tuple[int, int, int]], int]:
+    """Send all the requests in one write, and get the session, status and tile count of every response, and how
+    many sessions the server has after them.
+    """
+    server = Server()
+    listener = await server.loop.create_server(lambda: Connection(server), HOST, 0)
+    async with listener:
+        reader, writer = await asyncio.open_connection(HOST, listener.sockets[0].getsockname()[1])
+        writer.write(b''.join(REQUEST.pack(*request) for request in requests))
+        responses = []
+        for _ in requests:
+            number, status, _, tiles = RESPONSE.unpack(await reader.readexactly(RESPONSE.size))
+            await reader.readexactly(tiles * TILE.size)
+            responses.append((number, status, tiles))
+        sessions = server.sessions
+        writer.close()
+        await writer.wait_closed()
+    return responses, sessions
+
+
+def test_close_then_new() -> None:
+    width, height, _ = SIZES[0]
+    i, j = next(place for place in coordinates(width, height) if place is not None)
+    # more than a turn's worth before the CLOSE, so what comes after it is still waiting when it's handled
+    flags = [(7, Op.FLAG, i, j)] * (TURN_LIMIT + 1)
+    requests = [(7, Op.NEW, 0, 0), *flags, (7, Op.CLOSE, 0, 0), (7, Op.OPEN, i, j), (7, Op.NEW, 0, 0),
+                (7, Op.OPEN, i, j), (8, Op.NEW, 0, 0)]
+    responses, sessions = asyncio.run(exchange(requests))
+
+    # in order for each session
+    assert [status for number, status, _ in responses if number == 8] == [Status.PLAYING]
+    seven = [(status, tiles) for number, status, tiles in responses if number == 7]
+    assert [status for status, _ in seven[:len(flags) + 2]] == [Status.PLAYING] * (len(flags) + 2)
+    # the OPEN right after the CLOSE has no game yet, the one after the NEW is the first click of a new game
+    assert seven[len(flags) + 2][0] == Status.INVALID
+    assert seven[len(flags) + 3][0] == Status.PLAYING
+    status, tiles = seven[len(flags) + 4]
+    assert status in {Status.PLAYING, Status.WON} and tiles > 0
+    assert sessions == 2  # the new 7, and 8
@@ -2,78 +2,78 @@
 
 from __future__ import annotations
 
-import enum
-from dataclasses import dataclass
+import math
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Iterable
 
 import pygame
 from pygame import draw
 
 
-class FlagType(enum.Enum):
-    OPEN = 0  # tile has been opened
-    NONE_CLOSED = 1  # tile is closed and not marked
-    FLAGGED = 2  # tile is flagged
-    QUESTION = 3  # tile is question flagged
-    POST_GAME_LOSS = 4  # shows mines post-game loss (does nothing to safe tiles)
-    POST_GAME_LOSS_CAUSE = 5  # shows the mine you clicked on that made you lose
-
+@dataclass
+class RenderCache:
+    """LRU cache of rendered text surfaces, keyed by (font, text, antialias, color).
+    Almost every label in the game is static, so this saves rasterizing the same glyphs every frame.
+    """
+    max_size: int = 512
+    hits: int = 0
+    misses: int = 0
 
-class TileType(enum.Enum):
-    NOT_YET_GENERATED = 0
-    SAFE = 1
-    MINE = 2
+    surfaces: OrderedDict[tuple[pygame.font.Font, str, bool, int], pygame.Surface] = \
+        field(init=False, repr=False, default_factory=OrderedDict)
 
+    def render(self, font: pygame.font.Font, text: str, antialias: bool, color: int) -> pygame.Surface:
+        key = (font, text, antialias, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)  # evict the least recently used
+        return surface
 
-@dataclass
-class Tile:
-    tile: TileType = TileType.NOT_YET_GENERATED
-    flag: FlagType = FlagType.NONE_CLOSED
+    def clear(self) -> None:
+        self.surfaces.clear()
+        self.hits = 0
+        self.misses = 0
 
-    @property
-    def open_safe(self) -> bool:
-        return self.flag == FlagType.OPEN
 
-    @property
-    def closed(self) -> bool:
-        return not self.open_safe
+text_cache = RenderCache()
 
-    @property
-    def safe(self) -> bool:
-        return self.tile in {TileType.SAFE, TileType.NOT_YET_GENERATED}
 
-    @property
-    def mined(self) -> bool:
-        return not self.safe
+def render_text(font: pygame.font.Font, text: str, antialias: bool, color: int) -> pygame.Surface:
+    """Render text through the shared cache. Surfaces may be shared, so never draw onto them."""
+    return text_cache.render(font, text, antialias, color)
 
-    @property
-    def unmarked(self) -> bool:
-        return self.flag == FlagType.NONE_CLOSED
 
-    @property
-    def flagged(self) -> bool:
-        return self.flag in {FlagType.FLAGGED, FlagType.QUESTION}
+BACKGROUND_COLOR = 0x202020
 
 
-def clear_canvas(canvas: pygame.Surface):
-    canvas.fill(0x202020)
+def clear_canvas(canvas: pygame.Surface, rect: pygame.Rect = None):
+    canvas.fill(BACKGROUND_COLOR, rect)
 
 
-def draw_centered_text(canvas: pygame.Surface, text: pygame.Surface, x: float, y: float) -> None:
+def centered_text_blit(text: pygame.Surface, x: float, y: float) -> tuple[pygame.Surface, tuple[float, float]]:
+    """Get the (surface, position) pair for `Surface.blits` that centers the text at x,y."""
     text_rect = text.get_rect()
-    canvas.blit(text, (x - text_rect.width/2, y - text_rect.height/2))
+    return text, (x - text_rect.width/2, y - text_rect.height/2)
 
 
-def draw_right_align_text(canvas: pygame.Surface, text: pygame.Surface, x: float, y: float) -> None:
+def draw_centered_text(canvas: pygame.Surface, text: pygame.Surface, x: float, y: float) -> pygame.Rect:
+    return canvas.blit(*centered_text_blit(text, x, y))
+
+
+def draw_right_align_text(canvas: pygame.Surface, text: pygame.Surface, x: float, y: float) -> pygame.Rect:
     text_rect = text.get_rect()
-    canvas.blit(text, (x - text_rect.width, y))
+    return canvas.blit(text, (x - text_rect.width, y))
 
 
-def draw_hexagon(canvas: pygame.Surface,
-                 center_x: float, center_y: float,
-                 radius: float,
-                 color: int,
-                 ) -> None:
-    """Draws a hexagon with the given center and size"""
+def _hexagon_points(center_x: float, center_y: float, radius: float) -> tuple[tuple[float, float], ...]:
     apo = radius * 0.8660254037844386
     #   1   2
     # 6   .   3
@@ -84,4 +84,66 @@ def draw_hexagon(canvas: pygame.Surface,
     point4 = (center_x + radius/2, center_y + apo)
     point5 = (center_x - radius/2, center_y + apo)
     point6 = (center_x - radius, center_y)
-    draw.aalines(canvas, color, True, (point1, point2, point3, point4, point5, point6))
+    return point1, point2, point3, point4, point5, point6
+
+
+def draw_hexagon(canvas: pygame.Surface,
+                 center_x: float, center_y: float,
+                 radius: float,
+                 color: int,
+                 ) -> None:
+    """Draws a hexagon with the given center and size"""
+    draw.aalines(canvas, color, True, _hexagon_points(center_x, center_y, radius))
+
+
+# Anything not in the hexagon (the corners of the sprite) is transparent. Nothing in the game is drawn in this color.
+_ATLAS_COLORKEY = 0xff00fe
+
+
+@dataclass
+class HexagonAtlas:
+    """Pre-rendered hexagons of one radius, one sprite per color.
+    Drawing a tile is then a single blit (or one entry in a `Surface.blits` batch) instead of antialiased lines.
+    The inside of each sprite is filled with the background, so blitting a sprite also erases the old tile.
+    """
+    canvas: pygame.Surface
+    radius: float = 0.0
+
+    sprites: dict[int, pygame.Surface] = field(init=False, repr=False, default_factory=dict)
+    half_width: int = field(init=False, default=0)
+    half_height: int = field(init=False, default=0)
+
+    def rebuild(self, radius: float, colors: Iterable[int]) -> None:
+        """Render every color at a new radius. Does nothing if the radius didn't change."""
+        if radius == self.radius and self.sprites:
+            return
+        self.radius = radius
+        self.sprites.clear()
+        # a few pixels of padding for the antialiasing
+        self.half_width = math.ceil(radius) + 3
+        self.half_height = math.ceil(radius * 0.8660254037844386) + 3
+        for color in colors:
+            self._render(color)
+
+    def _render(self, color: int) -> pygame.Surface:
+        size = (2*self.half_width, 2*self.half_height)
+        sprite = pygame.Surface(size, 0, self.canvas)
+        sprite.fill(BACKGROUND_COLOR)
+        draw.aalines(sprite, color, True, _hexagon_points(self.half_width, self.half_height, self.radius))
+        # Cut out the corners. This has to stay well clear of the neighboring tiles, since the sprite positions are
+        # rounded to whole pixels. The colorkey on the mask is the background, so only the corners are copied.
+        mask = pygame.Surface(size, 0, self.canvas)
+        mask.fill(_ATLAS_COLORKEY)
+        draw.polygon(mask, BACKGROUND_COLOR, _hexagon_points(self.half_width, self.half_height, self.radius + 0.5))
+        mask.set_colorkey(BACKGROUND_COLOR)
+        sprite.blit(mask, (0, 0))
+        sprite.set_colorkey(_ATLAS_COLORKEY, pygame.RLEACCEL)
+        self.sprites[color] = sprite
+        return sprite
+
+    def sprite_blit(self, color: int, center_x: float, center_y: float) -> tuple[pygame.Surface, tuple[int, int]]:
+        """Get the (surface, position) pair for `Surface.blits` that draws a hexagon centered at x,y."""
+        sprite = self.sprites.get(color)
+        if sprite is None:
+            sprite = self._render(color)
+        return sprite, (round(center_x) - self.half_width, round(center_y) - self.half_height)